@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: broker.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Job queue between API nodes and workers: in-memory and Redis.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+import collections
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.history import get_history
+from app.models import JobStatus, WorkerJob
+from app.storage import StorageBackend
+
+
+class Broker(ABC):
+    """Queue of jobs with at-least-once delivery.
+
+    A reserved job stays invisible to other workers until its visibility
+    deadline. The worker extends the deadline while it runs the job and acks
+    it when done. If the worker dies, the deadline passes and
+    `requeue_expired` puts the job back with `attempts` incremented.
+    """
+
+    @abstractmethod
+    def enqueue(self, job: WorkerJob) -> None: ...
+
+    @abstractmethod
+    def reserve(self, visibility_timeout: float) -> Optional[WorkerJob]:
+        """Take the next job, or return None if the queue is empty."""
+
+    @abstractmethod
+    def extend(self, job_id: str, visibility_timeout: float) -> None: ...
+
+    @abstractmethod
+    def ack(self, job_id: str) -> None: ...
+
+    @abstractmethod
+    def nack(self, job_id: str) -> None:
+        """Give a reserved job back for an immediate retry."""
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        """Requeue jobs whose visibility deadline passed, returns how many."""
+
+    @abstractmethod
+    def set_status(self, status: JobStatus) -> None: ...
+
+    @abstractmethod
+    def get_status(self, job_id: str) -> Optional[JobStatus]: ...
+
+    @abstractmethod
+    def claim_history(self, job_id: str) -> bool:
+        """Return True only the first time it is called for a job, so one
+        API node records a finished job in the history."""
+
+
+class InMemoryBroker(Broker):
+    """Broker for a single process, used in tests and for local development."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue: collections.deque[str] = collections.deque()
+        self._jobs: dict[str, WorkerJob] = {}
+        self._attempts: collections.Counter[str] = collections.Counter()
+        self._deadlines: dict[str, float] = {}
+        self._statuses: dict[str, JobStatus] = {}
+        self._recorded: set[str] = set()
+
+    def enqueue(self, job: WorkerJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._statuses[job.job_id] = JobStatus(job_id=job.job_id, status="queued")
+            self._queue.appendleft(job.job_id)
+
+    def reserve(self, visibility_timeout: float) -> Optional[WorkerJob]:
+        with self._lock:
+            if not self._queue:
+                return None
+            job_id = self._queue.pop()
+            self._deadlines[job_id] = self._clock() + visibility_timeout
+            return self._jobs[job_id].model_copy(
+                update={"attempts": self._attempts[job_id]}
+            )
+
+    def extend(self, job_id: str, visibility_timeout: float) -> None:
+        with self._lock:
+            if job_id in self._deadlines:
+                self._deadlines[job_id] = self._clock() + visibility_timeout
+
+    def ack(self, job_id: str) -> None:
+        with self._lock:
+            self._deadlines.pop(job_id, None)
+            self._jobs.pop(job_id, None)
+            self._attempts.pop(job_id, None)
+
+    def _requeue(self, job_id: str) -> None:
+        del self._deadlines[job_id]
+        self._attempts[job_id] += 1
+        # Retries go to the front of the queue
+        self._queue.append(job_id)
+
+    def nack(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._deadlines:
+                self._requeue(job_id)
+
+    def requeue_expired(self) -> int:
+        with self._lock:
+            now = self._clock()
+            expired = [j for j, deadline in self._deadlines.items() if deadline <= now]
+            for job_id in expired:
+                self._requeue(job_id)
+            return len(expired)
+
+    def set_status(self, status: JobStatus) -> None:
+        with self._lock:
+            self._statuses[status.job_id] = status
+
+    def get_status(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            return self._statuses.get(job_id)
+
+    def claim_history(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._recorded:
+                return False
+            self._recorded.add(job_id)
+            return True
+
+
+# Moving a job from the queue to the processing set must be atomic, or a
+# worker dying in between would lose it.
+RESERVE_SCRIPT = """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then return nil end
+redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+return {job_id, redis.call('HGET', KEYS[3], job_id), redis.call('HGET', KEYS[4], job_id)}
+"""
+
+# Only requeues jobs still in the processing set, so a job that expired
+# twice or was acked in the meantime is not queued again.
+REQUEUE_SCRIPT = """
+local requeued = 0
+for _, job_id in ipairs(ARGV) do
+  if redis.call('ZREM', KEYS[1], job_id) == 1 then
+    redis.call('HINCRBY', KEYS[3], job_id, 1)
+    redis.call('RPUSH', KEYS[2], job_id)
+    requeued = requeued + 1
+  end
+end
+return requeued
+"""
+
+
+class RedisBroker(Broker):
+    """Broker on a Redis-compatible server, shared by API nodes and workers.
+
+    Keys, all under `prefix`:
+        queue       list of job ids, pushed left and popped right
+        processing  sorted set of reserved job ids scored by deadline
+        jobs        hash of job id to job JSON
+        attempts    hash of job id to retry count
+        status:<id> job status JSON, expiring after `status_ttl` seconds
+        recorded:<id> set once the job is in the history, expiring likewise
+
+    Deadlines use the workers' wall clocks, which must be roughly in sync.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ffmpegapi", status_ttl: int = 86400):
+        self.client = client
+        self.status_ttl = status_ttl
+        self._queue = f"{prefix}:queue"
+        self._processing = f"{prefix}:processing"
+        self._jobs = f"{prefix}:jobs"
+        self._attempts = f"{prefix}:attempts"
+        self._status_prefix = f"{prefix}:status:"
+        self._recorded_prefix = f"{prefix}:recorded:"
+        self._reserve = client.register_script(RESERVE_SCRIPT)
+        self._requeue = client.register_script(REQUEUE_SCRIPT)
+
+    def enqueue(self, job: WorkerJob) -> None:
+        status = JobStatus(job_id=job.job_id, status="queued")
+        pipe = self.client.pipeline()
+        pipe.hset(self._jobs, job.job_id, job.model_dump_json())
+        pipe.set(
+            self._status_prefix + job.job_id,
+            status.model_dump_json(),
+            ex=self.status_ttl,
+        )
+        pipe.lpush(self._queue, job.job_id)
+        pipe.execute()
+
+    def reserve(self, visibility_timeout: float) -> Optional[WorkerJob]:
+        reserved = self._reserve(
+            keys=[self._queue, self._processing, self._jobs, self._attempts],
+            args=[time.time() + visibility_timeout],
+        )
+        if not reserved:
+            return None
+        job_id, job_json, attempts = reserved
+        if job_json is None:
+            # Acked by a worker whose deadline had already passed
+            self.client.zrem(self._processing, job_id)
+            return None
+        job = WorkerJob.model_validate_json(job_json)
+        return job.model_copy(update={"attempts": int(attempts or 0)})
+
+    def extend(self, job_id: str, visibility_timeout: float) -> None:
+        self.client.zadd(
+            self._processing, {job_id: time.time() + visibility_timeout}, xx=True
+        )
+
+    def ack(self, job_id: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.zrem(self._processing, job_id)
+        pipe.hdel(self._jobs, job_id)
+        pipe.hdel(self._attempts, job_id)
+        pipe.execute()
+
+    def nack(self, job_id: str) -> None:
+        self._requeue(
+            keys=[self._processing, self._queue, self._attempts], args=[job_id]
+        )
+
+    def requeue_expired(self) -> int:
+        expired = self.client.zrangebyscore(self._processing, "-inf", time.time())
+        if not expired:
+            return 0
+        return self._requeue(
+            keys=[self._processing, self._queue, self._attempts], args=expired
+        )
+
+    def set_status(self, status: JobStatus) -> None:
+        self.client.set(
+            self._status_prefix + status.job_id,
+            status.model_dump_json(),
+            ex=self.status_ttl,
+        )
+
+    def get_status(self, job_id: str) -> Optional[JobStatus]:
+        data = self.client.get(self._status_prefix + job_id)
+        return JobStatus.model_validate_json(data) if data else None
+
+    def claim_history(self, job_id: str) -> bool:
+        return bool(
+            self.client.set(
+                self._recorded_prefix + job_id, 1, nx=True, ex=self.status_ttl
+            )
+        )
+
+
+async def wait_for_job(
+    broker: Broker, job_id: str, timeout: float
+) -> Optional[JobStatus]:
+    """Poll the job status until it finished, or return None on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = await run_in_threadpool(broker.get_status, job_id)
+        if status is not None and status.status in ("succeeded", "failed"):
+            return status
+        await asyncio.sleep(settings.broker_poll_interval_seconds)
+    return None
+
+
+def record_job_history(broker: Broker, status: JobStatus) -> None:
+    """Record a job a worker finished in this node's history, once per job."""
+    if status.result is None or not broker.claim_history(status.job_id):
+        return
+    get_history().record(
+        status.result.cmd,
+        status.result.returncode,
+        status.result.usage,
+        ffmpeg_version=status.ffmpeg_version,
+    )
+
+
+def resolve_job_urls(
+    request: Request, storage: StorageBackend, status: JobStatus
+) -> JobStatus:
+    """Replace the storage keys in a worker result with public URLs."""
+    if status.result is None:
+        return status
+
+    result = status.result.model_copy(
+        update={
+            "output_url": storage.get_url(request, status.result.output_url),
+            "log_url": status.result.log_url
+            and storage.get_url(request, status.result.log_url),
+        }
+    )
+    return status.model_copy(update={"result": result})
+
+
+def create_redis_client() -> Any:
+    """Create a Redis client from settings. redis is an optional dependency."""
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(
+            "Distributed execution requires redis: pip install 'ffmpegapi[distributed]'"
+        )
+
+    return redis.Redis.from_url(settings.broker_url, decode_responses=True)
+
+
+@functools.lru_cache(maxsize=1)
+def get_broker() -> Broker:
+    """Return the broker configured in settings."""
+    return RedisBroker(
+        client=create_redis_client(),
+        prefix=settings.broker_prefix,
+        status_ttl=settings.broker_status_ttl_seconds,
+    )
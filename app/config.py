@@ -11,8 +11,11 @@ __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
 
+import os
+
+from pydantic import Field
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -20,9 +23,63 @@ class Settings(BaseSettings):
     output_dir: str = "outputs"
 
     input_tag_placeholder: str = "<input>"
+    max_input_files: int = 4
 
     allowed_commands: list[str] = ["ffmpeg", "ffprobe"]
     max_upload_size_mb: int = 100 * 1024 * 1024  # 100 MB
+    # resumable uploads not yet finalized are kept this long after their last chunk
+    pending_upload_ttl_minutes: int = 24 * 60  # 1 day
+
+    command_timeout_seconds: int = 30
+    stderr_tail_lines: int = 200
+    stdout_tail_bytes: int = 64 * 1024  # 64 KB
+    log_summary_max_messages: int = 50
+    log_file_name: str = "ffmpeg.log"
+    probe_timeout_seconds: int = 10
+
+    max_concurrent_jobs: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    max_jobs_per_client: int = 2
+    client_id_header: str = "X-API-Key"
+    # keyed by client id as shown in /queue/stats, e.g. "key:1a2b3c4d5e6f";
+    # API keys not listed here are ignored and the client is identified by address
+    client_weights: dict[str, float] = {}
+    default_client_weight: float = 1.0
+    # used to estimate job duration when the input cannot be probed
+    fallback_bytes_per_second: int = 500 * 1024
+
+    max_pipeline_steps: int = 10
+
+    live_segment_seconds: int = 4
+    live_timeout_seconds: int = 6 * 60 * 60  # 6 hours
+    live_poll_timeout_seconds: float = 30.0
+    live_poll_interval_seconds: float = 0.25
+
+    storage_backend: Literal["local", "s3"] = "local"
+    s3_bucket: str = ""
+    s3_prefix: str = ""
+    s3_endpoint_url: Optional[str] = None  # e.g. http://minio:9000
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    s3_part_size_mb: int = 16
+    s3_max_concurrency: int = 8
+    s3_presign_expiry_seconds: int = 3600
+
+    # "distributed": API nodes enqueue jobs on the broker and worker.py runs them.
+    # upload_dir and output_dir must then be shared between API and worker hosts.
+    execution_mode: Literal["local", "distributed"] = "local"
+    broker_url: str = "redis://localhost:6379/0"
+    broker_prefix: str = "ffmpegapi"
+    broker_visibility_timeout_seconds: int = 60
+    broker_max_retries: int = 3
+    broker_poll_interval_seconds: float = 0.5
+    broker_status_ttl_seconds: int = 24 * 60 * 60  # 1 day
+    worker_concurrency: int = 1
+    # how long /run waits for a distributed job, including its time in the queue
+    job_wait_timeout_seconds: int = 600
+
+    history_db_path: str = "history.db"
+    history_retention_days: int = 90
 
     env: Literal["development", "production"] = "development"
 
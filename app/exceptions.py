@@ -36,3 +36,28 @@ class ProhibitedOperationException(HTTPException):
 class CommandExecutionException(HTTPException):
     def __init__(self, message: str):
         super().__init__(status_code=500, detail=f"Command execution failed: {message}")
+
+
+class UploadNotFoundException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="Upload not found.")
+
+
+class UploadConflictException(HTTPException):
+    def __init__(self, detail: str = "Upload is not complete."):
+        super().__init__(status_code=409, detail=detail)
+
+
+class InvalidUploadRangeException(HTTPException):
+    def __init__(self, detail: str = "Chunk is outside of the declared upload length."):
+        super().__init__(status_code=416, detail=detail)
+
+
+class LiveFileNotFoundException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="Live output file not found.")
+
+
+class JobNotFoundException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="Job not found.")
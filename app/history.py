@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: history.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Job resource usage history in SQLite, aggregated for capacity planning.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import functools
+import logging
+import os
+import shlex
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, Literal, Optional
+
+from app.config import settings
+from app.models import ResourceUsage, UsageAggregate
+from app.utils import (
+    get_ffmpeg_version,
+    get_input_bytes,
+    get_output_path_from_cmd,
+    numbered_input_tag,
+)
+
+logger = logging.getLogger(__name__)
+
+GroupBy = Literal["template", "preset", "ffmpeg_version"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    finished_at REAL NOT NULL,
+    template TEXT NOT NULL,
+    preset TEXT NOT NULL,
+    ffmpeg_version TEXT NOT NULL,
+    returncode INTEGER NOT NULL,
+    user_cpu_seconds REAL NOT NULL,
+    system_cpu_seconds REAL NOT NULL,
+    max_rss_bytes INTEGER NOT NULL,
+    wall_seconds REAL NOT NULL,
+    queue_wait_seconds REAL NOT NULL,
+    input_bytes INTEGER NOT NULL,
+    output_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+"""
+
+
+def get_command_template(cmd: str) -> str:
+    """Reduce a command to its template by dropping the job's file paths.
+
+    Example:
+        ffmpeg -i /uploads/<uuid>/a.mp4 -crf 23 /outputs/<uuid>/b.mp4
+        → ffmpeg -i <input0> -crf 23 '<output>.mp4'
+    """
+    tokens = shlex.split(cmd)
+    template: list[str] = []
+    input_count = 0
+    for index, token in enumerate(tokens):
+        if index > 0 and tokens[index - 1] == "-i":
+            template.append(numbered_input_tag(input_count))
+            input_count += 1
+        elif index == len(tokens) - 1 and index > 0:
+            template.append(f"<output>{os.path.splitext(token)[1]}")
+        else:
+            template.append(token)
+    return shlex.join(template)
+
+
+def get_preset(cmd: str) -> str:
+    """Return the encoder preset of a command, "none" if it sets none."""
+    tokens = shlex.split(cmd)
+    for index, token in enumerate(tokens[:-1]):
+        if token == "-preset" or token.startswith("-preset:"):
+            return tokens[index + 1]
+    return "none"
+
+
+def measure_job(
+    cmd: str, usage: ResourceUsage, queue_wait_seconds: float
+) -> ResourceUsage:
+    """Complete the process usage with the job's queue wait and file sizes.
+
+    Must run before the output is published, which may remove it locally.
+    """
+    output_path = get_output_path_from_cmd(cmd)
+    return usage.model_copy(
+        update={
+            "queue_wait_seconds": queue_wait_seconds,
+            "input_bytes": get_input_bytes(cmd),
+            "output_bytes": os.path.getsize(output_path)
+            if os.path.isfile(output_path)
+            else 0,
+        }
+    )
+
+
+class JobHistory:
+    """Append-only log of finished jobs and what they cost.
+
+    Each job is one row, so recording never reads, and aggregation is a
+    single GROUP BY over the requested time range.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success and is always closed."""
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record(
+        self,
+        cmd: str,
+        returncode: int,
+        usage: ResourceUsage,
+        finished_at: Optional[float] = None,
+        ffmpeg_version: Optional[str] = None,
+    ) -> None:
+        """Append a finished job. Errors are logged, never raised, so a
+        history problem cannot fail the job itself.
+
+        `ffmpeg_version` defaults to the local one; jobs run on a worker pass
+        the worker's version.
+        """
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        finished_at or time.time(),
+                        get_command_template(cmd),
+                        get_preset(cmd),
+                        ffmpeg_version or get_ffmpeg_version(),
+                        returncode,
+                        usage.user_cpu_seconds,
+                        usage.system_cpu_seconds,
+                        usage.max_rss_bytes,
+                        usage.wall_seconds,
+                        usage.queue_wait_seconds,
+                        usage.input_bytes,
+                        usage.output_bytes,
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error recording job history: {e}")
+
+    def aggregate(
+        self,
+        group_by: list[GroupBy],
+        window_seconds: int,
+        since: float,
+        until: float,
+    ) -> list[UsageAggregate]:
+        """Aggregate jobs finished in [since, until) per time window and group."""
+        # Column names come from the GroupBy literal, never from user input
+        columns = list(dict.fromkeys(group_by))
+        group_columns = "".join(f", {column}" for column in columns)
+        query = f"""
+            SELECT
+                CAST(finished_at / :window AS INTEGER) * :window AS window_start
+                {group_columns},
+                COUNT(*),
+                SUM(returncode != 0),
+                SUM(user_cpu_seconds),
+                SUM(system_cpu_seconds),
+                AVG(user_cpu_seconds + system_cpu_seconds),
+                AVG(wall_seconds),
+                MAX(wall_seconds),
+                AVG(queue_wait_seconds),
+                MAX(max_rss_bytes),
+                SUM(input_bytes),
+                SUM(output_bytes)
+            FROM jobs
+            WHERE finished_at >= :since AND finished_at < :until
+            GROUP BY window_start {group_columns}
+            ORDER BY window_start {group_columns}
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                query, {"window": window_seconds, "since": since, "until": until}
+            ).fetchall()
+
+        aggregates = []
+        for row in rows:
+            values = row[1 + len(columns) :]
+            aggregates.append(
+                UsageAggregate(
+                    window_start=row[0],
+                    group=dict(zip(columns, row[1 : 1 + len(columns)])),
+                    jobs=values[0],
+                    failed=values[1],
+                    user_cpu_seconds=values[2],
+                    system_cpu_seconds=values[3],
+                    avg_cpu_seconds=values[4],
+                    avg_wall_seconds=values[5],
+                    max_wall_seconds=values[6],
+                    avg_queue_wait_seconds=values[7],
+                    max_rss_bytes=values[8],
+                    input_bytes=values[9],
+                    output_bytes=values[10],
+                )
+            )
+        return aggregates
+
+    def prune(self, older_than: float) -> int:
+        """Delete jobs finished before `older_than`, returns how many."""
+        with self._connect() as connection:
+            return connection.execute(
+                "DELETE FROM jobs WHERE finished_at < ?", (older_than,)
+            ).rowcount
+
+
+@functools.lru_cache(maxsize=1)
+def get_history() -> JobHistory:
+    """Return the job history store configured in settings."""
+    return JobHistory(settings.history_db_path)
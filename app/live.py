@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: live.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Live HLS/DASH packaging, served segment by segment while encoding.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+import logging
+import os
+import re
+import shlex
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.exceptions import InvalidFFmpegCommandException, LiveFileNotFoundException
+from app.models import LiveJobStatus
+from app.scheduler import scheduler
+from app.utils import get_output_path_from_cmd, run_command
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMATS = {".m3u8": "hls", ".mpd": "dash"}
+
+MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".mpd": "application/dash+xml",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+    ".aac": "audio/aac",
+    ".vtt": "text/vtt",
+}
+
+# Segments never change once renamed into place, manifests change with every
+# segment until the encode finishes. The workspace is cleaned up 10 minutes
+# after the encode, so a cached final manifest must expire well before that
+# or it would list segments that are gone.
+SEGMENT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LIVE_MANIFEST_CACHE_CONTROL = "no-cache"
+FINAL_MANIFEST_CACHE_CONTROL = "public, max-age=60"
+
+SEGMENT_TIMELINE_PATTERN = re.compile(
+    r"<SegmentTimeline>(.*?)</SegmentTimeline>", re.DOTALL
+)
+TIMELINE_ENTRY_PATTERN = re.compile(r"<S\b([^>]*)>")
+REPEAT_PATTERN = re.compile(r'\br="(\d+)"')
+
+
+@dataclass
+class LiveJob:
+    job_id: str
+    cmd: str
+    manifest_name: str
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    returncode: Optional[int] = None
+    stderr: str = ""
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+
+# Jobs started by this process. Files are served from the workspace, so
+# other workers can still serve a job, they only lack its exit status.
+live_jobs: dict[str, LiveJob] = {}
+
+
+def get_manifest_format(filename: str) -> Optional[str]:
+    """Return "hls" or "dash" for a manifest file name, None otherwise."""
+    return MANIFEST_FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+def get_packaging_options(manifest_format: str, workspace: str) -> list[str]:
+    """Muxer options that make ffmpeg publish every finished segment at once.
+
+    Segments and playlists are written to a temporary name and renamed, so a
+    file that is visible under its final name is always complete.
+    """
+    if manifest_format == "hls":
+        return [
+            "-f", "hls",
+            "-hls_time", str(settings.live_segment_seconds),
+            "-hls_playlist_type", "event",
+            "-hls_list_size", "0",
+            "-hls_flags", "independent_segments+temp_file",
+            "-hls_segment_filename", os.path.join(workspace, "segment_%05d.ts"),
+        ]  # fmt: skip
+    return [
+        "-f", "dash",
+        "-seg_duration", str(settings.live_segment_seconds),
+        "-use_template", "1",
+        "-use_timeline", "1",
+        "-window_size", "0",
+    ]  # fmt: skip
+
+
+def build_live_cmd(cmd: str) -> str:
+    """Add the HLS or DASH packaging options for the command's output.
+
+    Options the command already sets are left as they are.
+    Example:
+        ffmpeg -i in.mp4 -c:v libx264 '/out/<uuid>/stream.m3u8'
+        → ffmpeg -i in.mp4 -c:v libx264 -f hls -hls_time 4 ... /out/<uuid>/stream.m3u8
+    """
+    output_path = get_output_path_from_cmd(cmd)
+    manifest_format = get_manifest_format(output_path)
+    if manifest_format is None:
+        raise InvalidFFmpegCommandException(
+            detail="Live output must be an HLS (.m3u8) or DASH (.mpd) manifest."
+        )
+
+    tokens = shlex.split(cmd)
+    options = get_packaging_options(manifest_format, os.path.dirname(output_path))
+    added: list[str] = []
+    for index in range(0, len(options), 2):
+        if options[index] not in tokens[:-1]:
+            added += options[index : index + 2]
+    return shlex.join([*tokens[:-1], *added, tokens[-1]])
+
+
+def count_segments(manifest: str, manifest_format: str) -> int:
+    """Number of segments a manifest lists.
+
+    For DASH with several representations this is the number of segments
+    every representation has, i.e. the playable length.
+    """
+    if manifest_format == "hls":
+        return manifest.count("#EXTINF")
+
+    counts = []
+    for timeline in SEGMENT_TIMELINE_PATTERN.findall(manifest):
+        count = 0
+        for attributes in TIMELINE_ENTRY_PATTERN.findall(timeline):
+            repeat = REPEAT_PATTERN.search(attributes)
+            count += 1 + (int(repeat.group(1)) if repeat else 0)
+        counts.append(count)
+    return min(counts, default=0)
+
+
+def is_manifest_final(manifest: str, manifest_format: str) -> bool:
+    """Whether ffmpeg wrote the manifest for the finished encode."""
+    if manifest_format == "hls":
+        return "#EXT-X-ENDLIST" in manifest
+    return 'type="static"' in manifest
+
+
+def get_live_file_path(job_id: str, filename: str) -> str:
+    """Return the path of a file in a live job workspace.
+
+    Hidden files and files ffmpeg is still writing are not served.
+    """
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise LiveFileNotFoundException()
+
+    if (
+        filename != os.path.basename(filename)
+        or filename.startswith(".")
+        or filename.endswith(".tmp")
+    ):
+        raise LiveFileNotFoundException()
+    return os.path.join(settings.output_dir, job_id, filename)
+
+
+def read_manifest(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def wait_for_manifest(
+    job_id: str, path: str, manifest_format: str, min_segments: int, timeout: float
+) -> Optional[str]:
+    """Long-poll until the manifest lists at least `min_segments` segments.
+
+    Returns early when the encode finished, and returns the current manifest
+    (or None if there is none yet) when the timeout runs out.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        manifest = await run_in_threadpool(read_manifest, path)
+        if manifest is not None and (
+            count_segments(manifest, manifest_format) >= min_segments
+            or is_manifest_final(manifest, manifest_format)
+        ):
+            return manifest
+
+        job = live_jobs.get(job_id)
+        if job and job.finished:
+            # The encode may have finished after the read above
+            return await run_in_threadpool(read_manifest, path)
+        if time.monotonic() >= deadline:
+            return manifest
+        await asyncio.sleep(settings.live_poll_interval_seconds)
+
+
+async def _run_live_job(job: LiveJob, cost: float, client_id: str) -> None:
+    try:
+        async with scheduler.slot(client_id, cost):
+            job.status = "running"
+            result = await run_in_threadpool(
+                run_command, job.cmd, timeout=settings.live_timeout_seconds
+            )
+        job.returncode = result.returncode
+        job.stderr = result.stderr
+        job.status = "succeeded" if result.returncode == 0 else "failed"
+    except subprocess.TimeoutExpired:
+        job.stderr = "Command timed out"
+        job.status = "failed"
+    except Exception as e:
+        logger.exception(f"Live job {job.job_id} failed")
+        job.stderr = str(e)
+        job.status = "failed"
+
+
+def start_live_job(cmd: str, client_id: str, cost: float) -> LiveJob:
+    """Start packaging in the background and return at once."""
+    # Forget finished jobs whose workspace was already cleaned up
+    for job_id, job in list(live_jobs.items()):
+        if job.finished and not os.path.isdir(
+            os.path.join(settings.output_dir, job_id)
+        ):
+            del live_jobs[job_id]
+
+    output_path = get_output_path_from_cmd(cmd)
+    job = LiveJob(
+        job_id=os.path.basename(os.path.dirname(output_path)),
+        cmd=cmd,
+        manifest_name=os.path.basename(output_path),
+    )
+    live_jobs[job.job_id] = job
+    job.task = asyncio.create_task(_run_live_job(job, cost, client_id))
+    return job
+
+
+def get_live_status(request: Request, job: LiveJob) -> LiveJobStatus:
+    path = get_live_file_path(job.job_id, job.manifest_name)
+    manifest_format = get_manifest_format(job.manifest_name)
+    if manifest_format is None:
+        raise LiveFileNotFoundException()
+    manifest = read_manifest(path) or ""
+    return LiveJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        manifest_url=str(
+            request.url_for("live_file", job_id=job.job_id, filename=job.manifest_name)
+        ),
+        segments=count_segments(manifest, manifest_format),
+        returncode=job.returncode,
+        stderr=job.stderr,
+    )
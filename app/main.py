@@ -10,23 +10,93 @@ Description: FFmpeg command execution via FastAPI endpoint.
 __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
-import shlex
+import os
 import subprocess
+import time
 from contextlib import asynccontextmanager
-from typing import Dict, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 from typing_extensions import Annotated
 
-from fastapi import Depends, FastAPI, Form, Request
-from fastapi.responses import RedirectResponse
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 
-from app.models import CommandResult
+from app.models import (
+    CommandResult,
+    JobStatus,
+    LiveJobStatus,
+    PipelineResult,
+    PipelineStep,
+    QueueStats,
+    UploadStatus,
+    UsageAggregate,
+    WorkerJob,
+)
+from app.pipeline import (
+    parse_pipeline_steps,
+    prepare_step_commands,
+    publish_pipeline_outputs,
+    run_pipeline,
+    validate_pipeline_inputs,
+)
+from app.live import (
+    FINAL_MANIFEST_CACHE_CONTROL,
+    LIVE_MANIFEST_CACHE_CONTROL,
+    MEDIA_TYPES,
+    SEGMENT_CACHE_CONTROL,
+    build_live_cmd,
+    get_live_file_path,
+    get_live_status,
+    get_manifest_format,
+    is_manifest_final,
+    live_jobs,
+    start_live_job,
+    wait_for_manifest,
+)
+from app.broker import (
+    get_broker,
+    record_job_history,
+    resolve_job_urls,
+    wait_for_job,
+)
+from app.exceptions import (
+    FFmpegNotInstalledException,
+    JobNotFoundException,
+    LiveFileNotFoundException,
+)
 from app.utils import (
     allow_command,
+    check_if_ffmpeg_installed,
+    create_temp_folder,
     ensure_directories_exist,
+    save_inputs,
     preprocess_cmd,
+    get_input_path_from_cmd,
     get_output_path_from_cmd,
+    get_input_codecs,
+    optimize_cmd,
+    probe_input,
+    run_command,
+    create_upload,
+    load_upload,
+    open_upload_for_write,
+    write_upload_chunk,
+    record_received_range,
+    finalize_upload,
 )
+from app.history import GroupBy, get_history, measure_job
+from app.storage import get_storage
+from app.scheduler import estimate_job_cost, get_client_id, scheduler
 from app.task import periodic_cleanup
 import asyncio
 from app.config import settings
@@ -53,6 +123,85 @@ async def read_root():
     return {"message": "use /run to execute the main functionality"}
 
 
+@app.get("/queue/stats", response_model=QueueStats)
+async def queue_stats() -> QueueStats:
+    """Returns per-client queue lengths, running jobs and wait times."""
+    return scheduler.stats()
+
+
+@app.get("/history/usage", response_model=list[UsageAggregate])
+async def history_usage(
+    group_by: List[GroupBy] = Query(
+        ["template"],
+        description="Group jobs by any of these, e.g. template and ffmpeg_version.",
+    ),
+    window_seconds: int = Query(3600, ge=60, description="Length of each time window."),
+    since: Optional[float] = Query(
+        None, description="Unix time to start from, defaults to 7 days ago."
+    ),
+    until: Optional[float] = Query(
+        None, description="Unix time to end at, defaults to now."
+    ),
+) -> list[UsageAggregate]:
+    """Aggregates the resource usage of finished jobs per time window."""
+    until = until or time.time()
+    since = since or until - 7 * 24 * 60 * 60
+    return await run_in_threadpool(
+        get_history().aggregate, group_by, window_seconds, since, until
+    )
+
+
+@app.post("/uploads", response_model=UploadStatus, status_code=201)
+async def upload_create(
+    filename: str = Form(..., description="Name of the file being uploaded."),
+    length: int = Form(..., description="Total size of the file in bytes."),
+) -> UploadStatus:
+    """Creates a resumable upload. Chunks are then sent to /uploads/{upload_id}."""
+    return create_upload(filename, length)
+
+
+@app.get("/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_status(upload_id: str) -> UploadStatus:
+    """Returns the byte ranges received so far, so a client can resume."""
+    return load_upload(upload_id)
+
+
+@app.api_route(
+    "/uploads/{upload_id}", methods=["PUT", "PATCH"], response_model=UploadStatus
+)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., description="Byte offset of this chunk."),
+) -> UploadStatus:
+    """Writes the request body at the given offset of the upload.
+
+    Chunks may be sent in any order and over several connections at once.
+    """
+    fd, status = await run_in_threadpool(
+        open_upload_for_write, upload_id, upload_offset
+    )
+    position = upload_offset
+    try:
+        async for chunk in request.stream():
+            position = await run_in_threadpool(
+                write_upload_chunk, fd, status, position, chunk
+            )
+    finally:
+        os.close(fd)
+        # Record whatever arrived, so an interrupted chunk can be resumed
+        status = await run_in_threadpool(
+            record_received_range, upload_id, upload_offset, position
+        )
+    return status
+
+
+@app.post("/uploads/{upload_id}/finalize", response_model=UploadStatus)
+async def upload_finalize(upload_id: str) -> UploadStatus:
+    """Marks the upload complete. It can then be used as `upload_id` in /run."""
+    return finalize_upload(upload_id)
+
+
 @app.post("/run", response_model=CommandResult)
 async def ffmpeg_run(
     request: Request,
@@ -61,29 +210,229 @@ async def ffmpeg_run(
     return_file: bool = Form(
         False, description="If true, returns the output file itself."
     ),
-) -> Union[CommandResult, Tuple[Dict[str, str], int], RedirectResponse]:
+    save_log: bool = Form(
+        False, description="If true, writes the full FFmpeg log to the job folder."
+    ),
+    optimize: bool = Form(
+        False, description="If true, rewrites known-slow patterns in the command."
+    ),
+    wait: bool = Form(
+        True,
+        description="Distributed mode only. If false, returns the queued job at "
+        "once; poll /jobs/{job_id} for progress and the result.",
+    ),
+    client_id: str = Depends(get_client_id),
+) -> Union[CommandResult, Tuple[Dict[str, str], int], RedirectResponse, JSONResponse]:
     """Executes the provided FFmpeg command after validation and preprocessing."""
     try:
-        # Tokenize and execute
-        result = subprocess.run(
-            shlex.split(cmd), capture_output=True, text=True, timeout=30
-        )
+        probe = await run_in_threadpool(probe_input, get_input_path_from_cmd(cmd))
 
-        output_url = request.url_for(
-            "static", path=get_output_path_from_cmd(cmd, replace_parent_dir=True)
-        )
+        optimizations: list[str] = []
+        if optimize:
+            cmd, optimizations = optimize_cmd(cmd, get_input_codecs(probe))
+
+        output_path = get_output_path_from_cmd(cmd, replace_parent_dir=True)
+        log_path = None
+        log_key = None
+        if save_log:
+            log_path = os.path.join(
+                os.path.dirname(get_output_path_from_cmd(cmd)), settings.log_file_name
+            )
+            log_key = os.path.join(os.path.dirname(output_path), settings.log_file_name)
+
+        if settings.execution_mode == "distributed":
+            job = WorkerJob(
+                job_id=os.path.dirname(output_path),
+                cmd=cmd,
+                output_key=output_path,
+                log_path=log_path,
+                log_key=log_key,
+                optimizations=optimizations,
+                enqueued_at=time.time(),
+            )
+            broker = get_broker()
+            await run_in_threadpool(broker.enqueue, job)
+            if not wait:
+                queued = JobStatus(job_id=job.job_id, status="queued")
+                return JSONResponse(queued.model_dump(), status_code=202)
+
+            finished = await wait_for_job(
+                broker, job.job_id, settings.job_wait_timeout_seconds
+            )
+            if finished is None:
+                return JSONResponse(
+                    {"error": f"Timed out waiting for job {job.job_id}"},
+                    status_code=408,
+                )
+            await run_in_threadpool(record_job_history, broker, finished)
+            finished = resolve_job_urls(request, get_storage(), finished)
+            if finished.result is None:
+                error = finished.error or f"Job {job.job_id} failed"
+                code = 408 if error == "Command timed out" else 500
+                return JSONResponse({"error": error}, status_code=code)
+            if return_file:
+                return RedirectResponse(finished.result.output_url, status_code=302)
+            return finished.result
+
+        async with scheduler.slot(client_id, estimate_job_cost(cmd, probe)) as ticket:
+            result = await run_in_threadpool(
+                run_command,
+                cmd,
+                timeout=settings.command_timeout_seconds,
+                log_path=log_path,
+            )
+
+        usage = measure_job(cmd, result.usage, ticket.wait_seconds)
+        await run_in_threadpool(get_history().record, cmd, result.returncode, usage)
+
+        storage = get_storage()
+        local_output_path = get_output_path_from_cmd(cmd)
+        if os.path.isfile(local_output_path):
+            await run_in_threadpool(storage.publish, local_output_path, output_path)
+        output_url = storage.get_url(request, output_path)
 
         if return_file:
             return RedirectResponse(output_url, status_code=302)
 
+        log_url = None
+        if log_path and log_key:
+            if os.path.isfile(log_path):
+                await run_in_threadpool(storage.publish, log_path, log_key)
+            log_url = storage.get_url(request, log_key)
+
         return CommandResult(
             cmd=cmd,
             stdout=result.stdout,
             stderr=result.stderr,
             returncode=result.returncode,
             output_url=str(output_url),
+            summary=result.summary,
+            log_url=log_url,
+            optimizations=optimizations,
+            usage=usage,
         )
     except subprocess.TimeoutExpired:
         return {"error": "Command timed out"}, 408
     except Exception as e:
         return {"error": str(e)}, 500
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(request: Request, job_id: str) -> JobStatus:
+    """Returns the status, progress and result of a job run by a worker."""
+    if settings.execution_mode != "distributed":
+        raise JobNotFoundException()
+    broker = get_broker()
+    status = await run_in_threadpool(broker.get_status, job_id)
+    if status is None:
+        raise JobNotFoundException()
+    if status.status in ("succeeded", "failed"):
+        await run_in_threadpool(record_job_history, broker, status)
+    return resolve_job_urls(request, get_storage(), status)
+
+
+@app.post("/pipeline", response_model=PipelineResult)
+async def ffmpeg_pipeline(
+    request: Request,
+    steps: Annotated[list[PipelineStep], Depends(parse_pipeline_steps)],
+    input_file: Annotated[Optional[list[UploadFile]], File()] = None,
+    upload_id: Annotated[
+        Optional[list[str]],
+        Form(description="Ids of finalized resumable uploads to use as inputs."),
+    ] = None,
+    client_id: str = Depends(get_client_id),
+) -> PipelineResult:
+    """Runs several FFmpeg commands where later steps read earlier outputs.
+
+    Intermediate files stay in the job folder and only the outputs of final
+    steps, those no other step reads, are returned.
+    """
+    if not check_if_ffmpeg_installed():
+        raise FFmpegNotInstalledException()
+
+    input_files = input_file or []
+    upload_ids = upload_id or []
+    validate_pipeline_inputs(steps, len(input_files) + len(upload_ids))
+
+    input_paths = await run_in_threadpool(save_inputs, input_files, upload_ids)
+    workspace = create_temp_folder(settings.output_dir)
+    commands = prepare_step_commands(steps, input_paths, workspace)
+
+    probe = await run_in_threadpool(probe_input, input_paths[0])
+    results = await run_pipeline(steps, commands, client_id, probe)
+    return await publish_pipeline_outputs(
+        request, get_storage(), steps, commands, results
+    )
+
+
+@app.post("/live", response_model=LiveJobStatus, status_code=202)
+async def ffmpeg_live(
+    request: Request,
+    _: Annotated[bool, Depends(allow_command)],
+    cmd: Annotated[str, Depends(preprocess_cmd)],
+    client_id: str = Depends(get_client_id),
+) -> LiveJobStatus:
+    """Starts packaging the input as HLS (.m3u8 output) or DASH (.mpd output).
+
+    Returns at once. Playback can start from `manifest_url` as soon as the
+    first segment is finished, while the rest is still being encoded.
+    """
+    cmd = build_live_cmd(cmd)
+    probe = await run_in_threadpool(probe_input, get_input_path_from_cmd(cmd))
+    job = start_live_job(cmd, client_id, estimate_job_cost(cmd, probe))
+    return get_live_status(request, job)
+
+
+@app.get("/live/{job_id}", response_model=LiveJobStatus)
+async def live_status(request: Request, job_id: str) -> LiveJobStatus:
+    """Returns the status of a live packaging job."""
+    if job_id not in live_jobs:
+        raise LiveFileNotFoundException()
+    return get_live_status(request, live_jobs[job_id])
+
+
+@app.get("/live/{job_id}/{filename}", name="live_file")
+async def live_file(
+    job_id: str,
+    filename: str,
+    min_segments: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Manifests only: wait until the manifest lists at least this "
+        "many segments, or the encode finished.",
+    ),
+) -> Response:
+    """Serves the manifest and finished segments of a live packaging job."""
+    path = get_live_file_path(job_id, filename)
+    manifest_format = get_manifest_format(filename)
+
+    if manifest_format is None:
+        if not os.path.isfile(path):
+            raise LiveFileNotFoundException()
+        extension = os.path.splitext(filename)[1].lower()
+        return FileResponse(
+            path,
+            media_type=MEDIA_TYPES.get(extension, "application/octet-stream"),
+            headers={"Cache-Control": SEGMENT_CACHE_CONTROL},
+        )
+
+    manifest = await wait_for_manifest(
+        job_id,
+        path,
+        manifest_format,
+        min_segments or 0,
+        settings.live_poll_timeout_seconds if min_segments else 0,
+    )
+    if manifest is None:
+        raise LiveFileNotFoundException()
+
+    final = is_manifest_final(manifest, manifest_format)
+    return Response(
+        manifest,
+        media_type=MEDIA_TYPES[os.path.splitext(filename)[1].lower()],
+        headers={
+            "Cache-Control": FINAL_MANIFEST_CACHE_CONTROL
+            if final
+            else LIVE_MANIFEST_CACHE_CONTROL
+        },
+    )
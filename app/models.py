@@ -11,16 +11,133 @@ __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
 
-from pydantic import BaseModel
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
 
 
 class FFmpegCommand(BaseModel):
     cmd: str
 
 
+class LogSummary(BaseModel):
+    errors: list[str] = Field(default_factory=list)
+    warnings: list[str] = Field(default_factory=list)
+    stats: Optional[str] = None
+    inputs: list[str] = Field(default_factory=list)
+    outputs: list[str] = Field(default_factory=list)
+
+
+class ResourceUsage(BaseModel):
+    user_cpu_seconds: float = 0.0
+    system_cpu_seconds: float = 0.0
+    max_rss_bytes: int = 0
+    wall_seconds: float = 0.0
+    queue_wait_seconds: float = 0.0
+    input_bytes: int = 0
+    output_bytes: int = 0
+
+
 class CommandResult(BaseModel):
     cmd: str
     stdout: str
     stderr: str
     returncode: int
     output_url: str
+    summary: LogSummary = Field(default_factory=LogSummary)
+    log_url: Optional[str] = None
+    optimizations: list[str] = Field(default_factory=list)
+    usage: ResourceUsage = Field(default_factory=ResourceUsage)
+
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    length: int
+    received: list[tuple[int, int]] = Field(default_factory=list)
+    complete: bool = False
+
+
+class ClientQueueStats(BaseModel):
+    client_id: str
+    weight: float
+    queued: int
+    running: int
+    completed: int
+    wait_p50_seconds: float
+    wait_p99_seconds: float
+
+
+class QueueStats(BaseModel):
+    max_concurrent_jobs: int
+    max_jobs_per_client: int
+    running: int
+    queued: int
+    clients: list[ClientQueueStats] = Field(default_factory=list)
+
+
+class PipelineStep(BaseModel):
+    id: str = Field(pattern=r"^[A-Za-z0-9_-]+$")
+    cmd: str
+
+
+class StepResult(BaseModel):
+    id: str
+    cmd: str
+    status: Literal["succeeded", "failed", "skipped"]
+    returncode: Optional[int] = None
+    stderr: str = ""
+    summary: LogSummary = Field(default_factory=LogSummary)
+    usage: ResourceUsage = Field(default_factory=ResourceUsage)
+
+
+class PipelineResult(BaseModel):
+    steps: list[StepResult]
+    outputs: dict[str, str] = Field(default_factory=dict)
+
+
+class LiveJobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    manifest_url: str
+    segments: int = 0
+    returncode: Optional[int] = None
+    stderr: str = ""
+
+
+class WorkerJob(BaseModel):
+    job_id: str
+    cmd: str
+    output_key: str
+    log_path: Optional[str] = None
+    log_key: Optional[str] = None
+    optimizations: list[str] = Field(default_factory=list)
+    attempts: int = 0
+    enqueued_at: float = 0.0  # unix time, workers may run on other hosts
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int = 0
+    worker: Optional[str] = None
+    ffmpeg_version: Optional[str] = None
+    progress: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[CommandResult] = None
+
+
+class UsageAggregate(BaseModel):
+    window_start: float
+    group: dict[str, str] = Field(default_factory=dict)
+    jobs: int
+    failed: int
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+    avg_cpu_seconds: float
+    avg_wall_seconds: float
+    max_wall_seconds: float
+    avg_queue_wait_seconds: float
+    max_rss_bytes: int
+    input_bytes: int
+    output_bytes: int
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: pipeline.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Multi-step FFmpeg pipelines with intermediates kept server-side.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+import logging
+import os
+import re
+import subprocess
+
+from fastapi import Form, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+
+from app.config import settings
+from app.history import get_history, measure_job
+from app.exceptions import InvalidFFmpegCommandException, ProhibitedOperationException
+from app.models import PipelineResult, PipelineStep, StepResult
+from app.scheduler import estimate_job_cost, scheduler
+from app.storage import StorageBackend
+from app.utils import (
+    contains_prohibited_operations,
+    get_input_arguments,
+    get_input_tag_index,
+    get_input_tag_indices,
+    get_output_path_from_cmd,
+    numbered_input_tag,
+    replace_input_tags,
+    replace_output_tag,
+    run_command,
+    validate_ffmpeg_command,
+    validate_input_count,
+)
+
+logger = logging.getLogger(__name__)
+
+STEP_REFERENCE_PATTERN = re.compile(r"<step:([A-Za-z0-9_-]+)>")
+
+
+def get_step_dependencies(step: PipelineStep) -> list[str]:
+    """Return the ids of the steps whose outputs this step reads."""
+    return STEP_REFERENCE_PATTERN.findall(step.cmd)
+
+
+def _sort_steps(steps: list[PipelineStep]) -> list[PipelineStep]:
+    """Order steps so every step comes after the steps it depends on."""
+    by_id = {step.id: step for step in steps}
+    ordered: list[PipelineStep] = []
+    state: dict[str, str] = {}
+
+    def visit(step_id: str) -> None:
+        if state.get(step_id) == "done":
+            return
+        if state.get(step_id) == "visiting":
+            raise InvalidFFmpegCommandException(
+                detail=f"Pipeline steps contain a cycle through '{step_id}'."
+            )
+        state[step_id] = "visiting"
+        for dependency in get_step_dependencies(by_id[step_id]):
+            visit(dependency)
+        state[step_id] = "done"
+        ordered.append(by_id[step_id])
+
+    for step in steps:
+        visit(step.id)
+    return ordered
+
+
+def parse_pipeline_steps(
+    steps: str = Form(
+        ...,
+        description='JSON list of steps, e.g. [{"id": "a", "cmd": "ffmpeg -i <input> a.wav"}]. '
+        "Steps read inputs with <input0>, <input1>, ... and earlier outputs with <step:id>.",
+    ),
+) -> list[PipelineStep]:
+    """Validates the pipeline steps and returns them in execution order."""
+    try:
+        parsed = TypeAdapter(list[PipelineStep]).validate_json(steps)
+    except ValidationError as e:
+        raise InvalidFFmpegCommandException(
+            status_code=422, detail=f"Invalid pipeline steps: {e.errors()[0]['msg']}"
+        )
+
+    if not 0 < len(parsed) <= settings.max_pipeline_steps:
+        raise InvalidFFmpegCommandException(
+            detail=f"Pipeline must contain between 1 and {settings.max_pipeline_steps} steps."
+        )
+
+    ids = [step.id for step in parsed]
+    if len(set(ids)) != len(ids):
+        raise InvalidFFmpegCommandException(detail="Pipeline step ids must be unique.")
+
+    output_names = [os.path.basename(get_output_path_from_cmd(s.cmd)) for s in parsed]
+    if len(set(output_names)) != len(output_names):
+        raise InvalidFFmpegCommandException(
+            detail="Pipeline step output file names must be unique."
+        )
+
+    for step in parsed:
+        if not validate_ffmpeg_command(step.cmd):
+            raise InvalidFFmpegCommandException()
+
+        if contains_prohibited_operations(step.cmd):
+            raise ProhibitedOperationException()
+
+        references = get_step_dependencies(step)
+        arguments = get_input_arguments(step.cmd)
+        if not arguments or any(
+            get_input_tag_index(argument) is None
+            and not STEP_REFERENCE_PATTERN.fullmatch(argument)
+            for argument in arguments
+        ):
+            raise InvalidFFmpegCommandException(
+                detail=f"Every '-i' of step '{step.id}' must be followed by an input "
+                f"tag such as '{numbered_input_tag(0)}' or by '<step:id>'."
+            )
+
+        for dependency in references:
+            if dependency not in ids or dependency == step.id:
+                raise InvalidFFmpegCommandException(
+                    detail=f"Step '{step.id}' references unknown step '{dependency}'."
+                )
+
+    return _sort_steps(parsed)
+
+
+def validate_pipeline_inputs(steps: list[PipelineStep], input_count: int) -> None:
+    """Check that the steps only reference inputs that were provided."""
+    validate_input_count(input_count)
+
+    for step in steps:
+        for index in get_input_tag_indices(step.cmd):
+            if index >= input_count:
+                raise InvalidFFmpegCommandException(
+                    detail=f"Step '{step.id}' references '{numbered_input_tag(index)}' "
+                    f"but only {input_count} input(s) were provided."
+                )
+
+
+def prepare_step_commands(
+    steps: list[PipelineStep], input_paths: list[str], workspace: str
+) -> dict[str, str]:
+    """Resolve input, output and step references to paths in the workspace.
+
+    Steps must be in execution order.
+    """
+    commands: dict[str, str] = {}
+    for step in steps:
+        # The output is replaced first, so its name cannot match inside a path
+        cmd = replace_output_tag(step.cmd, workspace)
+        cmd = replace_input_tags(cmd, input_paths)
+        cmd = STEP_REFERENCE_PATTERN.sub(
+            lambda match: f"'{get_output_path_from_cmd(commands[match.group(1)])}'",
+            cmd,
+        )
+        commands[step.id] = cmd
+    return commands
+
+
+async def run_pipeline(
+    steps: list[PipelineStep],
+    commands: dict[str, str],
+    client_id: str,
+    probe: dict,
+) -> list[StepResult]:
+    """Run all steps, each as soon as the steps it depends on succeeded.
+
+    Independent branches run concurrently, each taking its own scheduler
+    slot. Steps whose dependencies failed are skipped.
+    """
+    results: dict[str, StepResult] = {}
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run_step(step: PipelineStep) -> None:
+        dependencies = get_step_dependencies(step)
+        await asyncio.gather(*(tasks[dependency] for dependency in dependencies))
+
+        cmd = commands[step.id]
+        if any(results[d].status != "succeeded" for d in dependencies):
+            results[step.id] = StepResult(id=step.id, cmd=cmd, status="skipped")
+            return
+
+        try:
+            async with scheduler.slot(
+                client_id, estimate_job_cost(cmd, probe)
+            ) as ticket:
+                result = await run_in_threadpool(
+                    run_command, cmd, timeout=settings.command_timeout_seconds
+                )
+        except subprocess.TimeoutExpired:
+            results[step.id] = StepResult(
+                id=step.id, cmd=cmd, status="failed", stderr="Command timed out"
+            )
+            return
+        except Exception as e:
+            # A failing step must not abort the steps of other branches
+            logger.exception(f"Pipeline step {step.id} failed")
+            results[step.id] = StepResult(
+                id=step.id, cmd=cmd, status="failed", stderr=str(e)
+            )
+            return
+
+        succeeded = result.returncode == 0 and os.path.isfile(
+            get_output_path_from_cmd(cmd)
+        )
+        usage = measure_job(cmd, result.usage, ticket.wait_seconds)
+        await run_in_threadpool(get_history().record, cmd, result.returncode, usage)
+        results[step.id] = StepResult(
+            id=step.id,
+            cmd=cmd,
+            status="succeeded" if succeeded else "failed",
+            returncode=result.returncode,
+            stderr=result.stderr,
+            summary=result.summary,
+            usage=usage,
+        )
+
+    # Steps are in execution order, so dependencies always have a task already
+    for step in steps:
+        tasks[step.id] = asyncio.create_task(run_step(step))
+    await asyncio.gather(*tasks.values())
+
+    return [results[step.id] for step in steps]
+
+
+async def publish_pipeline_outputs(
+    request: Request,
+    storage: StorageBackend,
+    steps: list[PipelineStep],
+    commands: dict[str, str],
+    results: list[StepResult],
+) -> PipelineResult:
+    """Publish the outputs of final steps and delete the intermediates."""
+    referenced = {d for step in steps for d in get_step_dependencies(step)}
+    statuses = {result.id: result.status for result in results}
+
+    outputs: dict[str, str] = {}
+    for step in steps:
+        local_path = get_output_path_from_cmd(commands[step.id])
+        if step.id in referenced:
+            # Intermediates are only needed by later steps of this pipeline
+            if os.path.isfile(local_path):
+                os.remove(local_path)
+            continue
+        if statuses[step.id] != "succeeded":
+            continue
+
+        key = get_output_path_from_cmd(commands[step.id], replace_parent_dir=True)
+        await run_in_threadpool(storage.publish, local_path, key)
+        outputs[step.id] = storage.get_url(request, key)
+
+    return PipelineResult(steps=results, outputs=outputs)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: scheduler.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Weighted fair scheduling of jobs across clients.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+
+from app.config import settings
+from app.models import ClientQueueStats, QueueStats
+from app.utils.command_optimizer import (
+    AUDIO_EXTENSIONS,
+    IMAGE_EXTENSIONS,
+    ParsedCommand,
+    uses_stream_copy,
+)
+
+# Relative cost of one second of input, by kind of command
+COST_FACTORS = {
+    "image": 0.02,
+    "copy": 0.05,
+    "audio": 0.2,
+    "video": 1.0,
+}
+MIN_JOB_COST = 0.01
+WAIT_SAMPLES = 1000
+# Idle clients are forgotten after this long, so the client table stays bounded
+CLIENT_IDLE_SECONDS = 10 * 60
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the client by API key header, falling back to its address.
+
+    API keys are hashed, so they never show up in queue statistics. Only keys
+    configured in `client_weights` are honored; otherwise a client could get
+    a fresh fair share for every key it makes up.
+    """
+    api_key = request.headers.get(settings.client_id_header)
+    if api_key:
+        client_id = f"key:{hashlib.sha256(api_key.encode()).hexdigest()[:12]}"
+        if client_id in settings.client_weights:
+            return client_id
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+def estimate_job_cost(cmd: str, probe: dict) -> float:
+    """Estimate the relative cost of a command from its input and output type.
+
+    Uses the probed input duration, or the input size when the duration is
+    unknown, scaled by how expensive the kind of command usually is.
+    """
+    media_format = probe.get("format", {})
+    try:
+        seconds = float(media_format["duration"])
+    except (KeyError, TypeError, ValueError):
+        try:
+            seconds = int(media_format["size"]) / settings.fallback_bytes_per_second
+        except (KeyError, TypeError, ValueError):
+            seconds = 1.0
+
+    parsed = ParsedCommand.parse(cmd)
+    if parsed is None:
+        kind = "video"
+    elif parsed.output_extension in IMAGE_EXTENSIONS:
+        kind = "image"
+    elif uses_stream_copy(parsed.output_options):
+        kind = "copy"
+    elif parsed.output_extension in AUDIO_EXTENSIONS:
+        kind = "audio"
+    else:
+        kind = "video"
+
+    return max(seconds * COST_FACTORS[kind], MIN_JOB_COST)
+
+
+class JobTicket:
+    """A job waiting for, or holding, an execution slot."""
+
+    def __init__(self, client_id: str, cost: float, sequence: int):
+        self.client_id = client_id
+        self.cost = cost
+        self.sequence = sequence
+        self.loop = asyncio.get_running_loop()
+        self.future: asyncio.Future = self.loop.create_future()
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.monotonic()) - self.enqueued_at
+
+    def __lt__(self, other: "JobTicket") -> bool:
+        # Shortest job first within a client, then first come first served
+        return (self.cost, self.sequence) < (other.cost, other.sequence)
+
+
+class ClientQueue:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.pending: list[JobTicket] = []
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.virtual_time = 0.0
+        self.waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.idle_since = time.monotonic()
+
+    @property
+    def active(self) -> bool:
+        return self.queued > 0 or self.running > 0
+
+
+class FairScheduler:
+    """Hands out a fixed number of execution slots with weighted fair
+    queuing across clients and shortest-job-first within a client.
+
+    Each client has a virtual time that advances by cost / weight for every
+    job it starts. The eligible client with the lowest virtual time goes
+    next, so a client submitting many long jobs cannot starve others.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_jobs: int,
+        max_jobs_per_client: int,
+        client_weights: Optional[dict[str, float]] = None,
+        default_weight: float = 1.0,
+        idle_timeout: float = CLIENT_IDLE_SECONDS,
+    ):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_jobs_per_client = max_jobs_per_client
+        self.client_weights = client_weights or {}
+        self.default_weight = default_weight
+        self.idle_timeout = idle_timeout
+        self._clients: dict[str, ClientQueue] = {}
+        self._running = 0
+        self._sequence = itertools.count()
+        # Requests may run on different event loops, so guard with a thread lock
+        self._lock = threading.Lock()
+
+    def _client(self, client_id: str) -> ClientQueue:
+        client = self._clients.get(client_id)
+        if client is None:
+            weight = self.client_weights.get(client_id, self.default_weight)
+            client = self._clients[client_id] = ClientQueue(weight)
+        return client
+
+    def _evict_idle(self) -> None:
+        """Drop clients idle for longer than `idle_timeout`. Caller holds the
+        lock. This forgets their statistics and any virtual time they were
+        ahead by, which no longer reflects recent load after that long."""
+        deadline = time.monotonic() - self.idle_timeout
+        for client_id, client in list(self._clients.items()):
+            if not client.active and client.idle_since <= deadline:
+                del self._clients[client_id]
+
+    def _enqueue(self, client_id: str, cost: float) -> JobTicket:
+        with self._lock:
+            self._evict_idle()
+            client = self._client(client_id)
+            if not client.active:
+                # A returning client must not bank credit from its idle time
+                active = [c.virtual_time for c in self._clients.values() if c.active]
+                client.virtual_time = max(client.virtual_time, min(active, default=0))
+
+            ticket = JobTicket(client_id, cost, next(self._sequence))
+            heapq.heappush(client.pending, ticket)
+            client.queued += 1
+            self._dispatch()
+        return ticket
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while slots are free. Caller holds the lock."""
+        while self._running < self.max_concurrent_jobs:
+            eligible = [
+                (client.virtual_time, client_id)
+                for client_id, client in self._clients.items()
+                if client.queued > 0 and client.running < self.max_jobs_per_client
+            ]
+            if not eligible:
+                return
+
+            _, client_id = min(eligible)
+            client = self._clients[client_id]
+            ticket = heapq.heappop(client.pending)
+            client.queued -= 1
+            client.running += 1
+            client.virtual_time += ticket.cost / client.weight
+            self._running += 1
+
+            ticket.started_at = time.monotonic()
+            client.waits.append(ticket.wait_seconds)
+            ticket.loop.call_soon_threadsafe(_resolve, ticket.future)
+
+    def _cancel(self, ticket: JobTicket) -> None:
+        with self._lock:
+            if ticket.started_at is None:
+                client = self._clients[ticket.client_id]
+                client.pending.remove(ticket)
+                heapq.heapify(client.pending)
+                client.queued -= 1
+                if not client.active:
+                    client.idle_since = time.monotonic()
+                return
+        self.release(ticket, completed=False)
+
+    async def acquire(self, client_id: str, cost: float) -> JobTicket:
+        """Wait until the job may start."""
+        ticket = self._enqueue(client_id, cost)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self._cancel(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket: JobTicket, completed: bool = True) -> None:
+        """Free the slot held by a started job."""
+        with self._lock:
+            client = self._clients[ticket.client_id]
+            client.running -= 1
+            if completed:
+                client.completed += 1
+            if not client.active:
+                client.idle_since = time.monotonic()
+            self._running -= 1
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, cost: float) -> AsyncIterator[JobTicket]:
+        ticket = await self.acquire(client_id, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> QueueStats:
+        with self._lock:
+            clients = [
+                ClientQueueStats(
+                    client_id=client_id,
+                    weight=client.weight,
+                    queued=client.queued,
+                    running=client.running,
+                    completed=client.completed,
+                    wait_p50_seconds=_percentile(client.waits, 0.5),
+                    wait_p99_seconds=_percentile(client.waits, 0.99),
+                )
+                for client_id, client in self._clients.items()
+            ]
+            return QueueStats(
+                max_concurrent_jobs=self.max_concurrent_jobs,
+                max_jobs_per_client=self.max_jobs_per_client,
+                running=self._running,
+                queued=sum(client.queued for client in self._clients.values()),
+                clients=clients,
+            )
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _percentile(samples: deque[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+scheduler = FairScheduler(
+    max_concurrent_jobs=settings.max_concurrent_jobs,
+    max_jobs_per_client=settings.max_jobs_per_client,
+    client_weights=settings.client_weights,
+    default_weight=settings.default_client_weight,
+)
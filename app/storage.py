@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: storage.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Output storage backends: local disk and S3-compatible stores.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import functools
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from fastapi import Request
+
+from app.config import settings
+
+
+class StorageBackend(ABC):
+    """Where finished output files are published and served from.
+
+    Keys are paths relative to the output directory, e.g. "<uuid>/output.mp4".
+    """
+
+    @abstractmethod
+    def publish(self, local_path: str, key: str) -> None: ...
+
+    @abstractmethod
+    def get_url(self, request: Request, key: str) -> str: ...
+
+
+class LocalStorage(StorageBackend):
+    """Outputs stay in the output directory and are served under /static."""
+
+    def publish(self, local_path: str, key: str) -> None:
+        # ffmpeg already wrote the file where /static serves it from
+        return None
+
+    def get_url(self, request: Request, key: str) -> str:
+        return str(request.url_for("static", path=key))
+
+
+class S3Storage(StorageBackend):
+    """Outputs are uploaded to an S3-compatible bucket and served through
+    presigned URLs. Local copies are removed once uploaded, so API nodes
+    keep no outputs on disk.
+
+    Files larger than one part are sent as a multipart upload with the parts
+    uploaded concurrently, each read with pread straight from the file.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        prefix: str = "",
+        part_size: int = 16 * 1024 * 1024,
+        max_concurrency: int = 8,
+        presign_expiry_seconds: int = 3600,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.presign_expiry_seconds = presign_expiry_seconds
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def publish(self, local_path: str, key: str) -> None:
+        object_key = self._object_key(key)
+        size = os.path.getsize(local_path)
+        if size <= self.part_size:
+            with open(local_path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=f)
+        else:
+            self._upload_multipart(local_path, object_key, size)
+
+        os.remove(local_path)
+        try:
+            # Drop the job folder once its last file is uploaded
+            os.rmdir(os.path.dirname(local_path))
+        except OSError:
+            pass
+
+    def _upload_multipart(self, local_path: str, object_key: str, size: int) -> None:
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=object_key
+        )["UploadId"]
+        part_count = (size + self.part_size - 1) // self.part_size
+
+        with open(local_path, "rb") as f:
+
+            def upload_part(index: int) -> dict:
+                body = os.pread(f.fileno(), self.part_size, index * self.part_size)
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=index + 1,
+                    Body=body,
+                )
+                return {"PartNumber": index + 1, "ETag": response["ETag"]}
+
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    parts = list(executor.map(upload_part, range(part_count)))
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            except Exception:
+                self.client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id
+                )
+                raise
+
+    def get_url(self, request: Request, key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.presign_expiry_seconds,
+        )
+
+
+def create_s3_client() -> Any:
+    """Create a boto3 S3 client from settings. boto3 is an optional dependency."""
+    try:
+        import boto3
+    except ImportError:
+        raise RuntimeError(
+            "The s3 storage backend requires boto3: pip install 'ffmpegapi[s3]'"
+        )
+
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.s3_endpoint_url,
+        region_name=settings.s3_region,
+        aws_access_key_id=settings.s3_access_key_id,
+        aws_secret_access_key=settings.s3_secret_access_key,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_storage() -> StorageBackend:
+    """Return the storage backend configured in settings."""
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            client=create_s3_client(),
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            part_size=settings.s3_part_size_mb * 1024 * 1024,
+            max_concurrency=settings.s3_max_concurrency,
+            presign_expiry_seconds=settings.s3_presign_expiry_seconds,
+        )
+    return LocalStorage()
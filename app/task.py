@@ -16,26 +16,44 @@ import os
 import shutil
 import logging
 import asyncio
+import time
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
+from app.history import get_history
+from app.models import UploadStatus
+from app.utils.uploads import UPLOAD_METADATA_FILE
 
 logger = logging.getLogger(__name__)
 
 
+def is_pending_upload(folder_path: str) -> bool:
+    """Whether the folder holds a resumable upload that is not finalized yet."""
+    try:
+        with open(os.path.join(folder_path, UPLOAD_METADATA_FILE)) as f:
+            return not UploadStatus.model_validate_json(f.read()).complete
+    except (OSError, ValueError):
+        return False
+
+
 def cleanup_old_folders(path) -> None:
     """Deletes sub folders and their contents if older than 10 minutes.
-    Does not delete the parent folder itself.
+    Does not delete the parent folder itself. Resumable uploads still being
+    sent are kept for `pending_upload_ttl_minutes` after their last chunk.
     """
     if not os.path.exists(path):
         return
 
     now = datetime.datetime.now()
-    timeout = 10  # minutes
 
     for subdir in os.listdir(path):
         folder_path = os.path.join(path, subdir)
         if not os.path.isdir(folder_path):
             continue
 
+        timeout = 10  # minutes
+        if is_pending_upload(folder_path):
+            timeout = settings.pending_upload_ttl_minutes
+
         stat = os.stat(folder_path)
         modified = datetime.datetime.fromtimestamp(stat.st_mtime)
 
@@ -56,4 +74,6 @@ async def periodic_cleanup(interval: int = 600) -> None:
     while True:
         cleanup_old_folders(settings.upload_dir)
         cleanup_old_folders(settings.output_dir)
+        retention_seconds = settings.history_retention_days * 24 * 60 * 60
+        await run_in_threadpool(get_history().prune, time.time() - retention_seconds)
         await asyncio.sleep(interval)
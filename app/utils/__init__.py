@@ -17,24 +17,63 @@ from app.utils.validation import (
     validate_ffmpeg_command,
     contains_prohibited_operations,
     check_if_input_tag_exists,
+    get_input_tag_pattern,
+    get_input_tag_index,
+    get_input_arguments,
     input_file_size_within_limit,
     allow_command,
 )
 
 from app.utils.file_operations import (
     save_uploaded_file,
+    save_uploaded_stream,
+)
+
+from app.utils.uploads import (
+    merge_ranges,
+    create_upload,
+    load_upload,
+    open_upload_for_write,
+    write_upload_chunk,
+    record_received_range,
+    finalize_upload,
+    get_upload_path,
 )
 
 from app.utils.command_processing import (
     preprocess_cmd,
+    validate_input_count,
+    validate_input_tags,
+    save_inputs,
+    numbered_input_tag,
+    get_input_tag_indices,
     replace_input_tag,
+    replace_input_tags,
+    get_input_path_from_cmd,
+    get_input_bytes,
     get_output_path_from_cmd,
     replace_output_tag,
 )
 
+from app.utils.command_optimizer import (
+    get_input_codecs,
+    optimize_cmd,
+)
+
 from app.utils.system import (
     create_temp_folder,
     ensure_directories_exist,
+    probe_input,
+    get_ffmpeg_version,
+)
+
+from app.utils.ffmpeg_log import (
+    FFmpegLogCollector,
+)
+
+from app.utils.execution import (
+    ExecutionResult,
+    run_command,
 )
 
 
@@ -45,16 +84,47 @@ __all__ = [
     "validate_ffmpeg_command",
     "contains_prohibited_operations",
     "check_if_input_tag_exists",
+    "get_input_tag_pattern",
+    "get_input_tag_index",
+    "get_input_arguments",
     "input_file_size_within_limit",
     "allow_command",
     # File operations
     "save_uploaded_file",
+    "save_uploaded_stream",
+    # Resumable uploads
+    "merge_ranges",
+    "create_upload",
+    "load_upload",
+    "open_upload_for_write",
+    "write_upload_chunk",
+    "record_received_range",
+    "finalize_upload",
+    "get_upload_path",
     # Command processing
     "preprocess_cmd",
+    "validate_input_count",
+    "validate_input_tags",
+    "save_inputs",
+    "numbered_input_tag",
+    "get_input_tag_indices",
     "replace_input_tag",
+    "replace_input_tags",
+    "get_input_path_from_cmd",
+    "get_input_bytes",
     "get_output_path_from_cmd",
     "replace_output_tag",
+    # Command optimization
+    "get_input_codecs",
+    "optimize_cmd",
     # System operations
     "create_temp_folder",
     "ensure_directories_exist",
+    "probe_input",
+    "get_ffmpeg_version",
+    # Log parsing
+    "FFmpegLogCollector",
+    # Execution
+    "ExecutionResult",
+    "run_command",
 ]
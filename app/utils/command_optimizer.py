@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: command_optimizer.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Opt-in rewrites of known-slow FFmpeg command patterns.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import os
+import re
+import shlex
+from typing import Callable, Iterable, Optional
+
+
+# Options that never take a value
+FLAG_OPTIONS = {
+    "-y",
+    "-n",
+    "-vn",
+    "-an",
+    "-sn",
+    "-dn",
+    "-re",
+    "-shortest",
+    "-copyts",
+    "-start_at_zero",
+    "-hide_banner",
+    "-nostdin",
+    "-stats",
+    "-nostats",
+    "-accurate_seek",
+    "-noaccurate_seek",
+    "-bitexact",
+    "-autorotate",
+    "-noautorotate",
+    "-autoscale",
+    "-noautoscale",
+    "-xerror",
+    "-benchmark",
+    "-ignore_unknown",
+    "-copy_unknown",
+}
+
+# Options that take one value, by name without stream specifier ("-c:v" is
+# "-c"). A command with any option outside these two sets is not rewritten,
+# since the optimizer could not tell its values from its options.
+VALUE_OPTIONS = {
+    "-c",
+    "-codec",
+    "-vcodec",
+    "-acodec",
+    "-scodec",
+    "-b",
+    "-crf",
+    "-qp",
+    "-q",
+    "-qscale",
+    "-aq",
+    "-preset",
+    "-tune",
+    "-profile",
+    "-level",
+    "-pix_fmt",
+    "-r",
+    "-framerate",
+    "-s",
+    "-g",
+    "-bf",
+    "-refs",
+    "-keyint_min",
+    "-sc_threshold",
+    "-aspect",
+    "-maxrate",
+    "-minrate",
+    "-bufsize",
+    "-x264-params",
+    "-x265-params",
+    "-vf",
+    "-af",
+    "-filter",
+    "-filter_complex",
+    "-lavfi",
+    "-ar",
+    "-ac",
+    "-sample_fmt",
+    "-ss",
+    "-sseof",
+    "-to",
+    "-t",
+    "-fs",
+    "-itsoffset",
+    "-itsscale",
+    "-stream_loop",
+    "-f",
+    "-map",
+    "-map_metadata",
+    "-map_chapters",
+    "-metadata",
+    "-disposition",
+    "-movflags",
+    "-frames",
+    "-vframes",
+    "-aframes",
+    "-threads",
+    "-loglevel",
+    "-v",
+    "-hwaccel",
+    "-vsync",
+    "-fps_mode",
+    "-tag",
+    "-strict",
+    "-max_muxing_queue_size",
+    "-fflags",
+    "-flags",
+    "-bsf",
+    "-color_primaries",
+    "-color_trc",
+    "-colorspace",
+    "-color_range",
+    "-timecode",
+}
+
+FILTER_OPTIONS = {"-vf", "-af", "-filter", "-filter:v", "-filter:a"}
+COMPLEX_FILTER_OPTIONS = {"-filter_complex", "-lavfi"}
+
+# Filters whose behaviour depends on absolute timestamps, which change when
+# seeking moves from the output to the input
+TIME_SENSITIVE_FILTERS = re.compile(
+    r"\b(subtitles|ass|setpts|asetpts|trim|atrim|select|aselect|fade|afade|drawtext)\b"
+)
+
+CODEC_OPTIONS = {
+    "v": {"-c:v", "-codec:v", "-vcodec"},
+    "a": {"-c:a", "-codec:a", "-acodec"},
+}
+GENERIC_CODEC_OPTIONS = {"-c", "-codec"}
+
+# Options that ask for a specific encoding, so stream copy would not honour
+# them. Input-side ones such as -r count too.
+ENCODING_OPTIONS = {
+    "v": {
+        "-vf",
+        "-filter:v",
+        "-b:v",
+        "-crf",
+        "-qp",
+        "-q:v",
+        "-qscale:v",
+        "-preset",
+        "-tune",
+        "-profile:v",
+        "-level",
+        "-pix_fmt",
+        "-r",
+        "-framerate",
+        "-s",
+        "-g",
+        "-aspect",
+        "-maxrate",
+        "-minrate",
+        "-bufsize",
+        "-x264-params",
+        "-x265-params",
+    },
+    "a": {
+        "-af",
+        "-filter:a",
+        "-b:a",
+        "-q:a",
+        "-qscale:a",
+        "-aq",
+        "-ar",
+        "-ac",
+        "-sample_fmt",
+        "-profile:a",
+    },
+}
+
+# Options that change every stream
+GENERIC_ENCODING_OPTIONS = {"-filter", "-itsscale"}
+
+ENCODER_CODECS = {
+    "libx264": "h264",
+    "h264": "h264",
+    "h264_nvenc": "h264",
+    "libx265": "hevc",
+    "hevc": "hevc",
+    "hevc_nvenc": "hevc",
+    "libvpx": "vp8",
+    "libvpx-vp9": "vp9",
+    "libaom-av1": "av1",
+    "libsvtav1": "av1",
+    "mpeg4": "mpeg4",
+    "aac": "aac",
+    "libfdk_aac": "aac",
+    "libmp3lame": "mp3",
+    "libopus": "opus",
+    "libvorbis": "vorbis",
+    "flac": "flac",
+    "ac3": "ac3",
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+AUDIO_EXTENSIONS = {
+    ".mp3",
+    ".aac",
+    ".m4a",
+    ".wav",
+    ".flac",
+    ".ogg",
+    ".opus",
+    ".ac3",
+}
+
+
+def _is_flag(name: str) -> bool:
+    return name in FLAG_OPTIONS
+
+
+def _takes_value(name: str) -> bool:
+    return name.split(":", 1)[0] in VALUE_OPTIONS
+
+
+def _options_are_known(options: list[str]) -> bool:
+    """Whether every token is a known option or the value of one.
+
+    A token where an option is expected that does not start with "-" is
+    another output file, so multi-output commands fail this check too.
+    """
+    index = 0
+    while index < len(options):
+        name = options[index]
+        if _is_flag(name):
+            index += 1
+        elif _takes_value(name) and index + 1 < len(options):
+            index += 2
+        else:
+            return False
+    return True
+
+
+class ParsedCommand:
+    """A single-input, single-output FFmpeg command split into its parts."""
+
+    def __init__(
+        self,
+        program: str,
+        input_options: list[str],
+        input_path: str,
+        output_options: list[str],
+        output_path: str,
+    ):
+        self.program = program
+        self.input_options = input_options
+        self.input_path = input_path
+        self.output_options = output_options
+        self.output_path = output_path
+
+    @classmethod
+    def parse(cls, cmd: str) -> Optional["ParsedCommand"]:
+        """Parse a command, returning None for shapes the optimizer skips."""
+        tokens = shlex.split(cmd)
+        if tokens.count("-i") != 1 or len(tokens) < 4:
+            return None
+
+        input_index = tokens.index("-i")
+        if input_index + 2 > len(tokens) - 1:
+            return None
+        if not _options_are_known(tokens[1:input_index]) or not _options_are_known(
+            tokens[input_index + 2 : -1]
+        ):
+            return None
+
+        return cls(
+            program=tokens[0],
+            input_options=tokens[1:input_index],
+            input_path=tokens[input_index + 1],
+            output_options=tokens[input_index + 2 : -1],
+            output_path=tokens[-1],
+        )
+
+    def to_cmd(self) -> str:
+        return shlex.join(
+            [
+                self.program,
+                *self.input_options,
+                "-i",
+                self.input_path,
+                *self.output_options,
+                self.output_path,
+            ]
+        )
+
+    @property
+    def output_extension(self) -> str:
+        return os.path.splitext(self.output_path)[1].lower()
+
+
+def _option_pairs(options: list[str]) -> list[tuple[int, str, Optional[str]]]:
+    """Split options into (index, name, value) entries.
+
+    The options must have passed `_options_are_known`.
+    """
+    pairs: list[tuple[int, str, Optional[str]]] = []
+    index = 0
+    while index < len(options):
+        name = options[index]
+        if _is_flag(name) or index + 1 >= len(options):
+            pairs.append((index, name, None))
+            index += 1
+        else:
+            pairs.append((index, name, options[index + 1]))
+            index += 2
+    return pairs
+
+
+def _has_option(options: list[str], names: Iterable[str]) -> bool:
+    names = set(names)
+    return any(name in names for _, name, _ in _option_pairs(options))
+
+
+def _option_values(options: list[str], names: Iterable[str]) -> list[str]:
+    names = set(names)
+    return [
+        value
+        for _, name, value in _option_pairs(options)
+        if name in names and value is not None
+    ]
+
+
+def uses_stream_copy(options: list[str]) -> bool:
+    codec_options = GENERIC_CODEC_OPTIONS | CODEC_OPTIONS["v"] | CODEC_OPTIONS["a"]
+    return "copy" in _option_values(options, codec_options)
+
+
+def stream_copy_same_codec(
+    parsed: ParsedCommand, input_codecs: dict[str, str]
+) -> Optional[str]:
+    """Replace re-encoding with stream copy when the target codec is the
+    source codec and no encoding parameters are requested."""
+    options = parsed.output_options
+    if _has_option(
+        parsed.input_options + options,
+        {"-ss", "-sseof", "-to", *COMPLEX_FILTER_OPTIONS, "-map"},
+    ):
+        return None
+
+    copied = []
+    for stream_type, names in CODEC_OPTIONS.items():
+        source_codec = input_codecs.get(stream_type)
+        if source_codec is None or _has_option(
+            parsed.input_options + options,
+            ENCODING_OPTIONS[stream_type] | GENERIC_ENCODING_OPTIONS,
+        ):
+            continue
+
+        for index, name, value in _option_pairs(options):
+            if name in names and ENCODER_CODECS.get(value or "") == source_codec:
+                options[index + 1] = "copy"
+                copied.append(f"{name} {value}")
+
+    if not copied:
+        return None
+    return f"replaced {', '.join(copied)} with stream copy (input codec matches)"
+
+
+def seek_before_input(
+    parsed: ParsedCommand, input_codecs: dict[str, str]
+) -> Optional[str]:
+    """Move an output-side -ss before -i, so FFmpeg seeks by keyframe
+    instead of decoding everything up to the seek point."""
+    options = parsed.output_options
+    seek = [
+        (index, value) for index, name, value in _option_pairs(options) if name == "-ss"
+    ]
+    if len(seek) != 1:
+        return None
+    index, value = seek[0]
+    if value is None:
+        return None
+
+    # Output -to and -copyts are measured against the original timestamps,
+    # and stream copy can only cut on keyframes, so seeking would change them
+    if _has_option(parsed.input_options, {"-ss", "-sseof", "-copyts"}):
+        return None
+    if _has_option(options, {"-to", "-copyts"}) or uses_stream_copy(options):
+        return None
+    filters = _option_values(options, FILTER_OPTIONS | COMPLEX_FILTER_OPTIONS)
+    if any(TIME_SENSITIVE_FILTERS.search(value) for value in filters):
+        return None
+
+    del options[index : index + 2]
+    parsed.input_options.extend(["-ss", value])
+    return f"moved -ss {value} before -i for keyframe seeking"
+
+
+def disable_unused_streams(
+    parsed: ParsedCommand, input_codecs: dict[str, str]
+) -> Optional[str]:
+    """Add -vn/-an/-sn for streams the output format cannot use, so they
+    are never demuxed or decoded."""
+    options = parsed.output_options
+    if _has_option(options, {"-map", *COMPLEX_FILTER_OPTIONS}):
+        return None
+
+    if parsed.output_extension in IMAGE_EXTENSIONS:
+        disabled = ["-an", "-sn"]
+    elif parsed.output_extension in AUDIO_EXTENSIONS:
+        if _has_option(options, CODEC_OPTIONS["v"] | ENCODING_OPTIONS["v"]):
+            return None
+        # Formats such as mp3, m4a and flac keep cover art as a video stream,
+        # so the video is only dropped when the probe shows there is none
+        if not input_codecs or "attached_pic" in input_codecs:
+            disabled = ["-sn"]
+        else:
+            disabled = ["-vn", "-sn"]
+    else:
+        return None
+
+    added = [flag for flag in disabled if flag not in options]
+    if not added:
+        return None
+    options[:0] = added
+    return f"added {' '.join(added)} for streams unused by {parsed.output_extension} output"
+
+
+OPTIMIZER_RULES: dict[str, Callable[[ParsedCommand, dict[str, str]], Optional[str]]] = {
+    # stream copy goes first, it must see the original -ss placement
+    "stream_copy_same_codec": stream_copy_same_codec,
+    "seek_before_input": seek_before_input,
+    "disable_unused_streams": disable_unused_streams,
+}
+
+
+def get_input_codecs(probe: dict) -> dict[str, str]:
+    """Map "v"/"a" to the codec of the first video/audio stream of a probe,
+    and "attached_pic" to the codec of the first cover art picture."""
+    codecs: dict[str, str] = {}
+    for stream in probe.get("streams", []):
+        stream_type = {"video": "v", "audio": "a"}.get(stream.get("codec_type"))
+        if stream.get("disposition", {}).get("attached_pic"):
+            stream_type = "attached_pic"
+        if stream_type and stream_type not in codecs and stream.get("codec_name"):
+            codecs[stream_type] = stream["codec_name"]
+    return codecs
+
+
+def optimize_cmd(
+    cmd: str,
+    input_codecs: Optional[dict[str, str]] = None,
+    rules: Optional[Iterable[str]] = None,
+) -> tuple[str, list[str]]:
+    """Rewrite known-slow patterns in a preprocessed command.
+
+    Returns the rewritten command and a description of each applied rewrite.
+    Commands the optimizer does not understand are returned unchanged.
+
+    Example:
+        ffmpeg -i in.mp4 -ss 00:10:00 -vframes 1 thumb.jpg
+        → ffmpeg -ss 00:10:00 -i in.mp4 -an -sn -vframes 1 thumb.jpg
+    """
+    parsed = ParsedCommand.parse(cmd)
+    if parsed is None:
+        return cmd, []
+
+    applied = []
+    for name, rule in OPTIMIZER_RULES.items():
+        if rules is not None and name not in rules:
+            continue
+        description = rule(parsed, input_codecs or {})
+        if description:
+            applied.append(f"{name}: {description}")
+
+    if not applied:
+        return cmd, []
+    return parsed.to_cmd(), applied
@@ -13,47 +13,137 @@ __version__ = "0.1.0"
 
 import os
 import shlex
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from typing_extensions import Annotated
 from fastapi import File, UploadFile, Form
 from app.config import settings
 from app.exceptions import InvalidFFmpegCommandException
-from app.utils.file_operations import save_uploaded_file
+from app.utils.file_operations import save_uploaded_stream
 from app.utils.system import create_temp_folder
-from app.utils.validation import input_file_size_within_limit
+from app.utils.uploads import get_upload_path
+from app.utils.validation import (
+    get_input_arguments,
+    get_input_tag_index,
+    get_input_tag_pattern,
+    input_file_size_within_limit,
+)
 
 
 def preprocess_cmd(
-    input_file: Annotated[UploadFile, File()],
+    input_file: Annotated[Optional[list[UploadFile]], File()] = None,
+    upload_id: Annotated[
+        Optional[list[str]],
+        Form(description="Ids of finalized resumable uploads to use as inputs."),
+    ] = None,
     cmd: str = Form(...),
 ) -> str:
-    """Saves the uploaded input file and replaces the input tag in the command.
+    """Saves the uploaded input files and replaces the input tags in the command.
 
     Example:
     If cmd is "ffmpeg -i input.mp4 -c:v libx264 output.mp4" and the uploaded file
     is "input.mp4", this function saves the file to the upload directory and replaces
     "input.mp4" with the full path to the saved file.
 
+    Several inputs are bound to numbered tags, "<input0>", "<input1>", ... in the
+    order the `input_file` fields are sent, followed by the `upload_id` fields,
+    which reference finalized resumable uploads used in place.
     """
+    input_files = input_file or []
+    upload_ids = upload_id or []
 
-    # check if multple -i tags exist, if yes raise exception
-    if cmd.count(r"-i") != 1:
+    validate_input_tags(cmd, len(input_files) + len(upload_ids))
+
+    full_paths = save_inputs(input_files, upload_ids)
+
+    new_cmd = replace_input_tags(cmd, full_paths)
+    new_cmd = replace_output_tag(new_cmd)
+    return new_cmd
+
+
+def validate_input_count(input_count: int) -> None:
+    """Check that at least one and at most `max_input_files` inputs were sent."""
+    if input_count == 0:
         raise InvalidFFmpegCommandException(
-            detail="Command must contain exactly one input tag '-i'."
+            status_code=422,
+            detail="At least one 'input_file' or 'upload_id' must be provided.",
         )
 
-    if not input_file_size_within_limit(input_file.size):
+    if input_count > settings.max_input_files:
         raise InvalidFFmpegCommandException(
-            status_code=413,
-            detail=f"Input file size exceeds the maximum allowed limit of {settings.max_upload_size_mb} bytes.",
+            detail=f"At most {settings.max_input_files} inputs are allowed."
         )
 
-    full_path = f"{create_temp_folder(settings.upload_dir)}/{input_file.filename}"
 
-    save_uploaded_file(input_file.file.read(), full_path)
+def validate_input_tags(cmd: str, input_count: int) -> None:
+    """Check that every '-i' reads an input tag bound to a provided input."""
+    validate_input_count(input_count)
+
+    indices = [get_input_tag_index(argument) for argument in get_input_arguments(cmd)]
+    if not indices or None in indices:
+        raise InvalidFFmpegCommandException(
+            detail="Every '-i' must be followed by an input tag such as "
+            f"'{numbered_input_tag(0)}'."
+        )
+
+    for index in get_input_tag_indices(cmd):
+        if index >= input_count:
+            raise InvalidFFmpegCommandException(
+                detail=f"Command references '{numbered_input_tag(index)}' but only "
+                f"{input_count} input(s) were provided."
+            )
 
-    new_cmd = replace_input_tag(cmd, full_path)
-    new_cmd = replace_output_tag(new_cmd)
-    return new_cmd
+
+def save_inputs(input_files: list[UploadFile], upload_ids: list[str]) -> list[str]:
+    """Save the uploaded input files and resolve the resumable uploads,
+    returning their local paths in input order.
+
+    All inputs are validated before anything is written, and the uploaded
+    files are streamed to disk concurrently.
+    """
+    for input_file in input_files:
+        if not input_file_size_within_limit(input_file.size):
+            raise InvalidFFmpegCommandException(
+                status_code=413,
+                detail=f"Input file size exceeds the maximum allowed limit of {settings.max_upload_size_mb} bytes.",
+            )
+    upload_paths = [get_upload_path(upload_id) for upload_id in upload_ids]
+
+    full_paths = [
+        f"{create_temp_folder(settings.upload_dir)}/{os.path.basename(input_file.filename or 'input')}"
+        for input_file in input_files
+    ]
+    if len(input_files) == 1:
+        save_uploaded_stream(input_files[0].file, full_paths[0])
+    elif input_files:
+        with ThreadPoolExecutor(max_workers=len(input_files)) as executor:
+            list(
+                executor.map(
+                    save_uploaded_stream,
+                    [input_file.file for input_file in input_files],
+                    full_paths,
+                )
+            )
+
+    return full_paths + upload_paths
+
+
+def numbered_input_tag(index: int) -> str:
+    """Return the numbered input tag for an index, e.g. 1 → "<input1>"."""
+    placeholder = settings.input_tag_placeholder
+    return f"{placeholder[:-1]}{index}{placeholder[-1]}"
+
+
+def get_input_tag_indices(cmd: str) -> list[int]:
+    """Return the input index of every input tag in the command."""
+    return [int(index or 0) for index in get_input_tag_pattern().findall(cmd)]
+
+
+def replace_input_tags(cmd: str, full_paths: list[str]) -> str:
+    """Replaces every input tag with the local path of the input it is bound to."""
+    return get_input_tag_pattern().sub(
+        lambda match: f"'{full_paths[int(match.group(1) or 0)]}'", cmd
+    )
 
 
 def replace_input_tag(cmd: str, full_path: str) -> str:
@@ -64,6 +154,23 @@ def replace_input_tag(cmd: str, full_path: str) -> str:
     return new_cmd
 
 
+def get_input_path_from_cmd(cmd: str) -> str:
+    """Extract the path following the first '-i' of an ffmpeg command string."""
+    tokens = shlex.split(cmd)
+    if "-i" not in tokens[:-1]:
+        return ""
+    return tokens[tokens.index("-i") + 1]
+
+
+def get_input_bytes(cmd: str) -> int:
+    """Total size of the input files of an ffmpeg command string."""
+    return sum(
+        os.path.getsize(path)
+        for path in get_input_arguments(cmd)
+        if os.path.isfile(path)
+    )
+
+
 def get_output_path_from_cmd(cmd: str, replace_parent_dir: bool = False) -> str:
     """Extract the output file path safely from an ffmpeg command string.
 
@@ -92,15 +199,19 @@ def get_output_path_from_cmd(cmd: str, replace_parent_dir: bool = False) -> str:
     return output_path
 
 
-def replace_output_tag(cmd: str) -> str:
-    "Replace the output tag in the command with the actual local output file path."
+def replace_output_tag(cmd: str, output_folder: Optional[str] = None) -> str:
+    """Replace the output tag in the command with the actual local output file path.
+
+    The output goes into a new temporary folder unless `output_folder` is given.
+    """
 
     # get the part after the last space
     output_file_name_part = get_output_path_from_cmd(cmd)
     # have only the part after last /
     output_file_name_part = output_file_name_part.split("/")[-1]
 
-    local_path = f"{create_temp_folder(settings.output_dir)}/{output_file_name_part}"
+    output_folder = output_folder or create_temp_folder(settings.output_dir)
+    local_path = f"{output_folder}/{output_file_name_part}"
 
     if cmd.endswith("'"):
         new_cmd = cmd.replace(output_file_name_part, f"{local_path}", 1)
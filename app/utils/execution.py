@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: execution.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Runs FFmpeg commands with bounded output capture.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import contextlib
+import io
+import os
+import resource
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, cast
+
+from app.config import settings
+from app.models import LogSummary, ResourceUsage
+from app.utils.ffmpeg_log import FFmpegLogCollector
+
+
+@dataclass
+class ExecutionResult:
+    stdout: str
+    stderr: str
+    returncode: int
+    summary: LogSummary = field(default_factory=LogSummary)
+    usage: ResourceUsage = field(default_factory=ResourceUsage)
+
+
+def _usage_from_rusage(
+    rusage: resource.struct_rusage, wall_seconds: float
+) -> ResourceUsage:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    return ResourceUsage(
+        user_cpu_seconds=rusage.ru_utime,
+        system_cpu_seconds=rusage.ru_stime,
+        max_rss_bytes=rusage.ru_maxrss * rss_unit,
+        wall_seconds=wall_seconds,
+    )
+
+
+def _read_stdout_tail(stream: io.BufferedReader, limit: int, sink: list[bytes]) -> None:
+    """Drain stdout, keeping at most the last `limit` bytes."""
+    buffer = bytearray()
+    for chunk in iter(lambda: stream.read1(65536), b""):
+        buffer += chunk
+        if len(buffer) > limit:
+            del buffer[: len(buffer) - limit]
+    sink.append(bytes(buffer))
+
+
+def run_command(
+    cmd: str,
+    timeout: float,
+    log_path: Optional[str] = None,
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> ExecutionResult:
+    """Execute a command, parsing stderr incrementally instead of buffering it.
+
+    Only the last `settings.stderr_tail_lines` lines of stderr and the last
+    `settings.stdout_tail_bytes` bytes of stdout are kept in memory. If
+    `log_path` is given, the complete stderr output is written there.
+    `on_progress` is called with every FFmpeg progress line ("frame=...").
+    The process is reaped with os.wait4, so the result includes its CPU time
+    and peak memory.
+
+    Raises subprocess.TimeoutExpired if the command exceeds `timeout` seconds.
+    """
+    with contextlib.ExitStack() as stack:
+        log_file = stack.enter_context(open(log_path, "wb")) if log_path else None
+        collector = FFmpegLogCollector(
+            tail_lines=settings.stderr_tail_lines,
+            max_messages=settings.log_summary_max_messages,
+            log_file=log_file,
+            on_progress=on_progress,
+        )
+        stack.callback(collector.close)
+
+        started = time.monotonic()
+        proc = subprocess.Popen(
+            shlex.split(cmd),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # Both are set since they are PIPEs; read1 needs the buffered type
+        stdout_pipe = cast(io.BufferedReader, proc.stdout)
+        stderr_pipe = cast(io.BufferedReader, proc.stderr)
+
+        stdout_sink: list[bytes] = []
+        stdout_reader = threading.Thread(
+            target=_read_stdout_tail,
+            args=(stdout_pipe, settings.stdout_tail_bytes, stdout_sink),
+            daemon=True,
+        )
+        stdout_reader.start()
+
+        # The process is reaped here rather than by Popen, so the timeout kill
+        # must not race the reap: once reaped, the pid may belong to another
+        # process. Both happen under `reap_lock`, and the reap only starts
+        # once the process has exited (waitid with WNOWAIT leaves it a zombie).
+        timed_out = threading.Event()
+        reap_lock = threading.Lock()
+
+        def _kill() -> None:
+            with reap_lock:
+                if proc.returncode is None:
+                    timed_out.set()
+                    os.kill(proc.pid, signal.SIGKILL)
+
+        timer = threading.Timer(timeout, _kill)
+        timer.start()
+        try:
+            for chunk in iter(lambda: stderr_pipe.read1(65536), b""):
+                collector.feed(chunk)
+            os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            with reap_lock:
+                _, wait_status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(wait_status)
+            wall_seconds = time.monotonic() - started
+        finally:
+            timer.cancel()
+            stdout_reader.join()
+            stdout_pipe.close()
+            stderr_pipe.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    stdout = stdout_sink[0] if stdout_sink else b""
+    return ExecutionResult(
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=collector.tail,
+        returncode=proc.returncode,
+        summary=collector.summary,
+        usage=_usage_from_rusage(rusage, wall_seconds),
+    )
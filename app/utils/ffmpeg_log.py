@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: ffmpeg_log.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Incremental parsing and bounded capture of FFmpeg stderr output.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import re
+from collections import deque
+from typing import BinaryIO, Callable, Optional
+
+from app.models import LogSummary
+
+
+ERROR_PATTERN = re.compile(
+    r"error|invalid|failed|no such file|not found|could not|cannot|unable to",
+    re.IGNORECASE,
+)
+WARNING_PATTERN = re.compile(r"warning|deprecated|past duration", re.IGNORECASE)
+STATS_PATTERN = re.compile(r"^(frame|size)=")
+LINE_SPLIT_PATTERN = re.compile(rb"[\r\n]")
+
+# A single line longer than this is cut, so a missing newline cannot grow memory
+MAX_PARTIAL_LINE_BYTES = 64 * 1024
+
+
+class FFmpegLogCollector:
+    """Consumes FFmpeg stderr chunk by chunk, keeping only a bounded tail
+    and a structured summary. Optionally spills the full log to a file.
+    """
+
+    def __init__(
+        self,
+        tail_lines: int,
+        max_messages: int,
+        log_file: Optional[BinaryIO] = None,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ):
+        self._tail: deque[str] = deque(maxlen=tail_lines)
+        self._max_messages = max_messages
+        self._log_file = log_file
+        self._on_progress = on_progress
+        self._partial = b""
+        self._section: Optional[str] = None
+        self._summary = LogSummary()
+
+    def feed(self, chunk: bytes) -> None:
+        """Feed a raw chunk of stderr output."""
+        if self._log_file is not None:
+            self._log_file.write(chunk)
+
+        parts = LINE_SPLIT_PATTERN.split(self._partial + chunk)
+        self._partial = parts.pop()[-MAX_PARTIAL_LINE_BYTES:]
+        for part in parts:
+            self._handle_line(part.decode("utf-8", errors="replace"))
+
+    def close(self) -> None:
+        """Flush any trailing partial line."""
+        if self._partial:
+            self._handle_line(self._partial.decode("utf-8", errors="replace"))
+            self._partial = b""
+
+    @property
+    def tail(self) -> str:
+        return "\n".join(self._tail)
+
+    @property
+    def summary(self) -> LogSummary:
+        return self._summary
+
+    def _append_bounded(self, items: list[str], line: str) -> None:
+        if len(items) < self._max_messages:
+            items.append(line)
+
+    def _handle_line(self, line: str) -> None:
+        if not line.strip():
+            return
+
+        stripped = line.strip()
+
+        # Progress lines arrive every few hundred ms; keep only the latest one
+        if STATS_PATTERN.match(stripped):
+            self._summary.stats = stripped
+            if self._on_progress is not None:
+                self._on_progress(stripped)
+            if self._tail and STATS_PATTERN.match(self._tail[-1]):
+                self._tail[-1] = stripped
+            else:
+                self._tail.append(stripped)
+            return
+
+        self._tail.append(line.rstrip())
+
+        if line.startswith("Input #"):
+            self._section = "input"
+            return
+        if line.startswith("Output #"):
+            self._section = "output"
+            return
+
+        if line.startswith((" ", "\t")) and self._section is not None:
+            # Indented lines inside a header describe streams or metadata
+            if stripped.startswith("Stream #"):
+                target = (
+                    self._summary.inputs
+                    if self._section == "input"
+                    else self._summary.outputs
+                )
+                self._append_bounded(target, stripped)
+            return
+
+        self._section = None
+
+        if ERROR_PATTERN.search(stripped):
+            self._append_bounded(self._summary.errors, stripped)
+        elif WARNING_PATTERN.search(stripped):
+            self._append_bounded(self._summary.warnings, stripped)
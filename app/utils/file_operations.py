@@ -11,6 +11,8 @@ __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
 import os
+import shutil
+from typing import BinaryIO
 
 
 def save_uploaded_file(file_bytes: bytes, destination_path: str) -> None:
@@ -19,3 +21,12 @@ def save_uploaded_file(file_bytes: bytes, destination_path: str) -> None:
     os.makedirs(os.path.dirname(destination_path), exist_ok=True)
     with open(destination_path, "wb") as f:
         f.write(file_bytes)
+
+
+def save_uploaded_stream(file: BinaryIO, destination_path: str) -> None:
+    """Stream an uploaded file object to the destination path in chunks,
+    without reading it into memory first."""
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    file.seek(0)
+    with open(destination_path, "wb") as f:
+        shutil.copyfileobj(file, f, length=1024 * 1024)
@@ -11,6 +11,9 @@ __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
 
+import functools
+import json
+import re
 import subprocess
 import uuid
 from app.config import settings
@@ -28,3 +31,45 @@ def ensure_directories_exist() -> None:
     """Ensure that the upload and output directories exist."""
     subprocess.run(["mkdir", "-p", settings.upload_dir])
     subprocess.run(["mkdir", "-p", settings.output_dir])
+
+
+def probe_input(path: str) -> dict:
+    """Return ffprobe's stream and format information for a media file.
+
+    Returns an empty dict if the file cannot be probed.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "stream=codec_type,codec_name:format=duration,size",
+                "-of",
+                "json",
+                path,
+            ],
+            capture_output=True,
+            text=True,
+            timeout=settings.probe_timeout_seconds,
+        )
+        return json.loads(result.stdout or "{}")
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def get_ffmpeg_version() -> str:
+    """Return the installed FFmpeg version, e.g. "6.1.1", or "unknown"."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-version"],
+            capture_output=True,
+            text=True,
+            timeout=settings.probe_timeout_seconds,
+        )
+        match = re.match(r"ffmpeg version (\S+)", result.stdout)
+    except (OSError, subprocess.TimeoutExpired, TypeError):
+        return "unknown"
+    return match.group(1) if match else "unknown"
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: uploads.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Resumable chunked uploads written in place with pwrite.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import fcntl
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.config import settings
+from app.exceptions import (
+    InvalidFFmpegCommandException,
+    InvalidUploadRangeException,
+    UploadConflictException,
+    UploadNotFoundException,
+)
+from app.models import UploadStatus
+from app.utils.validation import input_file_size_within_limit
+
+
+UPLOAD_METADATA_FILE = ".upload.json"
+UPLOAD_LOCK_FILE = ".upload.lock"
+
+
+def merge_ranges(
+    ranges: list[tuple[int, int]], start: int, end: int
+) -> list[tuple[int, int]]:
+    """Insert the half-open range [start, end) and merge overlapping or
+    adjacent ranges.
+
+    Example:
+        merge_ranges([(0, 10), (20, 30)], 10, 20) → [(0, 30)]
+    """
+    merged: list[tuple[int, int]] = []
+    for range_start, range_end in sorted([*ranges, (start, end)]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+def get_upload_folder(upload_id: str) -> str:
+    """Return the folder of an upload, rejecting ids that are not UUIDs."""
+    try:
+        uuid.UUID(upload_id)
+    except ValueError:
+        raise UploadNotFoundException()
+
+    folder = f"{settings.upload_dir}/{upload_id}"
+    if not os.path.exists(os.path.join(folder, UPLOAD_METADATA_FILE)):
+        raise UploadNotFoundException()
+    return folder
+
+
+def _save_status(folder: str, status: UploadStatus) -> None:
+    # Write then rename, so readers never see a half written file
+    temp_path = os.path.join(folder, f"{UPLOAD_METADATA_FILE}.tmp")
+    with open(temp_path, "w") as f:
+        f.write(status.model_dump_json())
+    os.replace(temp_path, os.path.join(folder, UPLOAD_METADATA_FILE))
+
+
+@contextmanager
+def _locked_status(upload_id: str) -> Iterator[tuple[str, UploadStatus]]:
+    """Hold an exclusive lock on the upload while its status is modified.
+
+    Chunks may arrive concurrently on different workers, so the lock is a
+    file lock rather than an in-process one.
+    """
+    folder = get_upload_folder(upload_id)
+    with open(os.path.join(folder, UPLOAD_LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield folder, load_upload(upload_id)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_upload(upload_id: str) -> UploadStatus:
+    """Load the current status of an upload."""
+    folder = get_upload_folder(upload_id)
+    with open(os.path.join(folder, UPLOAD_METADATA_FILE)) as f:
+        return UploadStatus.model_validate_json(f.read())
+
+
+def create_upload(filename: str, length: int) -> UploadStatus:
+    """Create an upload and preallocate its target file.
+
+    The target file is created at its final size up front (sparse on most
+    filesystems), so chunks can be written at their offsets in any order.
+    """
+    if not input_file_size_within_limit(length):
+        raise InvalidFFmpegCommandException(
+            status_code=413,
+            detail=f"Input file size exceeds the maximum allowed limit of {settings.max_upload_size_mb} bytes.",
+        )
+
+    filename = os.path.basename(filename)
+    if not filename or filename.startswith("."):
+        raise InvalidFFmpegCommandException(detail="Invalid upload filename.")
+
+    upload_id = str(uuid.uuid4())
+    folder = f"{settings.upload_dir}/{upload_id}"
+    os.makedirs(folder)
+    status = UploadStatus(upload_id=upload_id, filename=filename, length=length)
+
+    with open(os.path.join(folder, filename), "wb") as f:
+        f.truncate(length)
+    _save_status(folder, status)
+    return status
+
+
+def open_upload_for_write(upload_id: str, offset: int) -> tuple[int, UploadStatus]:
+    """Open the target file of an upload for positional writes at `offset`.
+
+    Returns the raw file descriptor, which the caller must close.
+    """
+    status = load_upload(upload_id)
+    if status.complete:
+        raise UploadConflictException(detail="Upload is already finalized.")
+    if not 0 <= offset < status.length:
+        raise InvalidUploadRangeException()
+
+    path = os.path.join(get_upload_folder(upload_id), status.filename)
+    return os.open(path, os.O_WRONLY), status
+
+
+def write_upload_chunk(
+    fd: int, status: UploadStatus, position: int, chunk: bytes
+) -> int:
+    """Write a chunk at `position` directly into the target file.
+
+    Returns the position after the chunk.
+    """
+    end = position + len(chunk)
+    if end > status.length:
+        raise InvalidUploadRangeException()
+
+    view = memoryview(chunk)
+    while view:
+        written = os.pwrite(fd, view, position)
+        position += written
+        view = view[written:]
+    return position
+
+
+def record_received_range(upload_id: str, start: int, end: int) -> UploadStatus:
+    """Mark [start, end) of the upload as received."""
+    with _locked_status(upload_id) as (folder, status):
+        if end > start:
+            status.received = merge_ranges(status.received, start, end)
+            _save_status(folder, status)
+        return status
+
+
+def finalize_upload(upload_id: str) -> UploadStatus:
+    """Mark the upload complete once every byte has been received."""
+    with _locked_status(upload_id) as (folder, status):
+        if status.received != [(0, status.length)]:
+            raise UploadConflictException(
+                detail=f"Upload is missing bytes; received ranges: {status.received}."
+            )
+        status.complete = True
+        _save_status(folder, status)
+        return status
+
+
+def get_upload_path(upload_id: str) -> str:
+    """Return the local path of a finalized upload for use as command input."""
+    status = load_upload(upload_id)
+    if not status.complete:
+        raise UploadConflictException()
+    return f"{get_upload_folder(upload_id)}/{status.filename}"
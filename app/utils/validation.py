@@ -11,7 +11,10 @@ __author__ = "Maria Kevin"
 __version__ = "0.1.0"
 
 
+import re
+import shlex
 import subprocess
+from typing import Optional
 
 from fastapi import Form
 from app.config import settings
@@ -54,9 +57,43 @@ def contains_prohibited_operations(cmd: str) -> bool:
     return any(excluded in cmd for excluded in commands_to_exclude)
 
 
+def get_input_tag_pattern() -> re.Pattern:
+    """Pattern matching the input tag and its numbered forms.
+
+    With the default placeholder this matches <input>, <input0>, <input1>, ...
+    """
+    placeholder = settings.input_tag_placeholder
+    return re.compile(
+        rf"{re.escape(placeholder[:-1])}(\d*){re.escape(placeholder[-1])}"
+    )
+
+
+def get_input_tag_index(tag: str) -> Optional[int]:
+    """Return the input index of a tag, or None if it is not an input tag.
+
+    The plain tag is an alias for index 0.
+    """
+    match = get_input_tag_pattern().fullmatch(tag)
+    if match is None:
+        return None
+    return int(match.group(1) or 0)
+
+
+def get_input_arguments(cmd: str) -> list[str]:
+    """Return the argument of every '-i' in the command."""
+    try:
+        tokens = shlex.split(cmd)
+    except ValueError:
+        return []
+    return [tokens[i + 1] for i, token in enumerate(tokens[:-1]) if token == "-i"]
+
+
 def check_if_input_tag_exists(cmd: str) -> bool:
     """Check if the command contains an input tag."""
-    return f"-i {settings.input_tag_placeholder}" in cmd
+    return any(
+        get_input_tag_index(argument) is not None
+        for argument in get_input_arguments(cmd)
+    )
 
 
 def input_file_size_within_limit(file_size: int | None) -> bool:
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: worker.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Worker process that runs FFmpeg jobs pulled from the broker.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import logging
+import os
+import signal
+import socket
+import subprocess
+import threading
+import time
+from typing import Optional
+
+from app.broker import Broker, get_broker
+from app.config import settings
+from app.history import measure_job
+from app.models import CommandResult, JobStatus, WorkerJob
+from app.storage import StorageBackend, get_storage
+from app.utils import (
+    ensure_directories_exist,
+    get_ffmpeg_version,
+    get_output_path_from_cmd,
+    run_command,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Pulls jobs from the broker one at a time, runs them and publishes the
+    outputs and the result.
+
+    While a job runs, a heartbeat thread keeps extending its visibility
+    deadline and publishes the latest FFmpeg progress line. A job whose
+    command fails or times out is finished; only a job the worker could not
+    complete (e.g. the output upload failed) is given back for a retry.
+    """
+
+    def __init__(
+        self, broker: Broker, storage: StorageBackend, name: Optional[str] = None
+    ):
+        self.broker = broker
+        self.storage = storage
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+
+    def process_next(self) -> bool:
+        """Run the next job. Returns False if the queue was empty."""
+        job = self.broker.reserve(settings.broker_visibility_timeout_seconds)
+        if job is None:
+            return False
+
+        if job.attempts > settings.broker_max_retries:
+            self.broker.set_status(
+                JobStatus(
+                    job_id=job.job_id,
+                    status="failed",
+                    attempts=job.attempts,
+                    error=f"Job failed after {job.attempts} attempts.",
+                )
+            )
+            self.broker.ack(job.job_id)
+            return True
+
+        self._run(job)
+        return True
+
+    def _run(self, job: WorkerJob) -> None:
+        status = JobStatus(
+            job_id=job.job_id, status="running", attempts=job.attempts, worker=self.name
+        )
+        self.broker.set_status(status)
+
+        progress: list[str] = []
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(status, progress, done), daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            final = self._execute(job, status, progress.append)
+        except Exception:
+            logger.exception(f"Job {job.job_id} failed, returning it to the queue")
+            self.broker.nack(job.job_id)
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+
+        # Status first: if the worker dies before the ack the job is re-run,
+        # it is never acked without a result
+        self.broker.set_status(final)
+        self.broker.ack(job.job_id)
+
+    def _heartbeat(
+        self, status: JobStatus, progress: list[str], done: threading.Event
+    ) -> None:
+        interval = min(1.0, settings.broker_visibility_timeout_seconds / 3)
+        published = None
+        while not done.wait(interval):
+            # Keep beating through broker errors, or the deadline would pass
+            # and another worker would run the job while this one still does
+            try:
+                self.broker.extend(
+                    status.job_id, settings.broker_visibility_timeout_seconds
+                )
+                if progress and progress[-1] != published:
+                    latest = progress[-1]
+                    self.broker.set_status(
+                        status.model_copy(update={"progress": latest})
+                    )
+                    published = latest
+                    del progress[:-1]
+            except Exception:
+                logger.exception(f"Heartbeat for job {status.job_id} failed")
+
+    def _execute(self, job: WorkerJob, status: JobStatus, on_progress) -> JobStatus:
+        local_output_path = get_output_path_from_cmd(job.cmd)
+        if job.attempts > 0:
+            # ffmpeg runs without a terminal and would refuse to overwrite the
+            # partial output of an earlier attempt
+            for path in (local_output_path, job.log_path):
+                if path and os.path.isfile(path):
+                    os.remove(path)
+
+        try:
+            result = run_command(
+                job.cmd,
+                timeout=settings.command_timeout_seconds,
+                log_path=job.log_path,
+                on_progress=on_progress,
+            )
+        except subprocess.TimeoutExpired:
+            return status.model_copy(
+                update={"status": "failed", "error": "Command timed out"}
+            )
+
+        queue_wait = max(0.0, time.time() - job.enqueued_at) if job.enqueued_at else 0.0
+        # The API records the usage in its history when it gets the result
+        usage = measure_job(job.cmd, result.usage, queue_wait)
+
+        if os.path.isfile(local_output_path):
+            self.storage.publish(local_output_path, job.output_key)
+        if job.log_path and job.log_key and os.path.isfile(job.log_path):
+            self.storage.publish(job.log_path, job.log_key)
+
+        # Workers cannot build public URLs, so the result carries storage
+        # keys that the API resolves when it returns the result
+        return status.model_copy(
+            update={
+                "status": "succeeded" if result.returncode == 0 else "failed",
+                "ffmpeg_version": get_ffmpeg_version(),
+                "progress": result.summary.stats,
+                "result": CommandResult(
+                    cmd=job.cmd,
+                    stdout=result.stdout,
+                    stderr=result.stderr,
+                    returncode=result.returncode,
+                    output_url=job.output_key,
+                    summary=result.summary,
+                    log_url=job.log_key,
+                    optimizations=job.optimizations,
+                    usage=usage,
+                ),
+            }
+        )
+
+    def run(self, stop: threading.Event) -> None:
+        """Process jobs until `stop` is set, finishing the current job first."""
+        while not stop.is_set():
+            self.broker.requeue_expired()
+            if not self.process_next():
+                stop.wait(settings.broker_poll_interval_seconds)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    ensure_directories_exist()
+    broker = get_broker()
+    storage = get_storage()
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    threads = [
+        threading.Thread(target=Worker(broker, storage).run, args=(stop,))
+        for _ in range(settings.worker_concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    logger.info(f"Started {len(threads)} worker(s) on {settings.broker_url}")
+    for thread in threads:
+        thread.join()
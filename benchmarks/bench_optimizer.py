@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: bench_optimizer.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Measures the speedup of each command optimizer rule.
+
+Usage:
+    python benchmarks/bench_optimizer.py [--duration 600] [--repeat 3]
+
+Requires ffmpeg and ffprobe on PATH. A synthetic H.264/AAC test video is
+generated once, then each rule's sample command is timed as written and as
+rewritten by that rule alone.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.command_optimizer import get_input_codecs, optimize_cmd
+from app.utils.system import probe_input
+
+
+# Sample commands per rule; {input} and {output_dir} are filled in at runtime
+CASES = {
+    "seek_before_input": "ffmpeg -y -i {input} -ss {seek} -vframes 1 {output_dir}/thumb.jpg",
+    "disable_unused_streams": "ffmpeg -y -i {input} -c:a libmp3lame -q:a 2 {output_dir}/audio.mp3",
+    "stream_copy_same_codec": "ffmpeg -y -i {input} -c:v libx264 -c:a aac {output_dir}/copy.mkv",
+}
+
+
+def generate_input(path: str, duration: int) -> None:
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size=1280x720:rate=30:duration={duration}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=440:duration={duration}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-g",
+            "60",
+            "-c:a",
+            "aac",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+
+def time_command(cmd: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(shlex.split(cmd), check=True, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=int, default=600, help="input seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        input_path = os.path.join(output_dir, "input.mp4")
+        print(f"Generating {args.duration}s test input...")
+        generate_input(input_path, args.duration)
+        input_codecs = get_input_codecs(probe_input(input_path))
+
+        print(f"{'rule':<26}{'original':>12}{'optimized':>12}{'speedup':>10}")
+        for rule, template in CASES.items():
+            cmd = template.format(
+                input=shlex.quote(input_path),
+                output_dir=shlex.quote(output_dir),
+                seek=int(args.duration * 0.9),
+            )
+            optimized, applied = optimize_cmd(cmd, input_codecs, rules=[rule])
+            if not applied:
+                print(f"{rule:<26}{'not applied':>34}")
+                continue
+
+            original_time = time_command(cmd, args.repeat)
+            optimized_time = time_command(optimized, args.repeat)
+            print(
+                f"{rule:<26}{original_time:>11.2f}s{optimized_time:>11.2f}s"
+                f"{original_time / optimized_time:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: conftest.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: shared test fixtures
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import pytest
+
+from app.config import settings
+from app.history import get_history
+
+
+@pytest.fixture(autouse=True)
+def history_db(tmp_path_factory, monkeypatch):
+    """Keep the job history of each test in its own database, outside the
+    test's tmp_path so tests can list that directory."""
+    path = tmp_path_factory.mktemp("history") / "history.db"
+    monkeypatch.setattr(settings, "history_db_path", str(path))
+    get_history.cache_clear()
+    yield
+    get_history.cache_clear()
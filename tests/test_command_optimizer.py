@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_command_optimizer.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for the FFmpeg command optimizer
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+from app.utils.command_optimizer import get_input_codecs, optimize_cmd
+
+
+def test_seek_before_input():
+    cmd = "ffmpeg -i '/tmp/in put.mp4' -ss 00:10:00 -vframes 1 /tmp/thumb.jpg"
+    new_cmd, applied = optimize_cmd(cmd, rules=["seek_before_input"])
+    assert (
+        new_cmd == "ffmpeg -ss 00:10:00 -i '/tmp/in put.mp4' -vframes 1 /tmp/thumb.jpg"
+    )
+    assert applied == [
+        "seek_before_input: moved -ss 00:10:00 before -i for keyframe seeking"
+    ]
+
+
+def test_seek_before_input_skipped_when_unsafe():
+    unsafe_cmds = [
+        "ffmpeg -i in.mp4 -ss 10 -to 20 -c:v libx264 out.mp4",
+        "ffmpeg -i in.mp4 -ss 10 -c copy out.mp4",
+        "ffmpeg -i in.mp4 -ss 10 -vf subtitles=in.srt out.mp4",
+        "ffmpeg -ss 5 -i in.mp4 -ss 10 out.mp4",
+    ]
+    for cmd in unsafe_cmds:
+        assert optimize_cmd(cmd, rules=["seek_before_input"]) == (cmd, [])
+
+
+def test_disable_unused_streams():
+    new_cmd, applied = optimize_cmd(
+        "ffmpeg -i in.mp4 -vframes 1 thumb.png", rules=["disable_unused_streams"]
+    )
+    assert new_cmd == "ffmpeg -i in.mp4 -an -sn -vframes 1 thumb.png"
+    assert len(applied) == 1
+
+    cmd = "ffmpeg -i in.mp4 -c:a libmp3lame -q:a 2 out.mp3"
+    new_cmd, _ = optimize_cmd(
+        cmd, {"v": "h264", "a": "aac"}, rules=["disable_unused_streams"]
+    )
+    assert new_cmd == "ffmpeg -i in.mp4 -vn -sn -c:a libmp3lame -q:a 2 out.mp3"
+
+    # cover art is kept, as is any video the probe could not rule out
+    for input_codecs in [{"a": "mp3", "attached_pic": "mjpeg"}, {}]:
+        new_cmd, _ = optimize_cmd(cmd, input_codecs, rules=["disable_unused_streams"])
+        assert new_cmd == "ffmpeg -i in.mp4 -sn -c:a libmp3lame -q:a 2 out.mp3"
+
+    # explicit stream selection and video output are left alone
+    for cmd in [
+        "ffmpeg -i in.mp4 -map 0:a out.mp3",
+        "ffmpeg -i in.mp4 -c:v libx264 out.mp4",
+        "ffmpeg -i in.mp4 -an -sn thumb.png",
+    ]:
+        assert optimize_cmd(cmd, rules=["disable_unused_streams"]) == (cmd, [])
+
+
+def test_stream_copy_same_codec():
+    codecs = {"v": "h264", "a": "aac"}
+    new_cmd, applied = optimize_cmd(
+        "ffmpeg -i in.mp4 -c:v libx264 -c:a aac out.mkv", codecs
+    )
+    assert new_cmd == "ffmpeg -i in.mp4 -c:v copy -c:a copy out.mkv"
+    assert applied == [
+        "stream_copy_same_codec: replaced -c:v libx264, -c:a aac with stream copy (input codec matches)"
+    ]
+
+    # encoding parameters keep the video re-encode, audio is still copied
+    new_cmd, _ = optimize_cmd(
+        "ffmpeg -i in.mp4 -c:v libx264 -crf 23 -c:a aac out.mkv", codecs
+    )
+    assert new_cmd == "ffmpeg -i in.mp4 -c:v libx264 -crf 23 -c:a copy out.mkv"
+
+    # different codec, no probe information, or a cut are left alone
+    for cmd, input_codecs in [
+        ("ffmpeg -i in.mp4 -c:v libx265 out.mkv", codecs),
+        ("ffmpeg -i in.mp4 -c:v libx264 out.mkv", {}),
+        ("ffmpeg -i in.mp4 -ss 10 -c:v libx264 out.mkv", codecs),
+        ("ffmpeg -i in.mp4 -c:v libx264 -filter hflip out.mkv", {"v": "h264"}),
+        ("ffmpeg -r 60 -i in.mp4 -c:v libx264 out.mkv", {"v": "h264"}),
+    ]:
+        assert optimize_cmd(cmd, input_codecs, rules=["stream_copy_same_codec"]) == (
+            cmd,
+            [],
+        )
+
+
+def test_optimize_cmd_combined_rules():
+    new_cmd, applied = optimize_cmd(
+        "ffmpeg -i in.mp4 -ss 00:10:00 -vframes 1 thumb.jpg", {"v": "h264"}
+    )
+    assert new_cmd == "ffmpeg -ss 00:10:00 -i in.mp4 -an -sn -vframes 1 thumb.jpg"
+    assert [rewrite.split(":")[0] for rewrite in applied] == [
+        "seek_before_input",
+        "disable_unused_streams",
+    ]
+
+
+def test_optimize_cmd_unsupported_shapes():
+    for cmd in [
+        "ffmpeg -i a.mp4 -i b.mp4 -ss 10 out.mp4",
+        # a second output would be cut too
+        "ffmpeg -i in.mp4 -ss 10 a.mp4 -vframes 1 b.jpg",
+        # unknown options could be flags, which would shift every value after
+        "ffmpeg -i in.mp4 -ss 10 -unknown_flag -to 20 out.mp4",
+    ]:
+        assert optimize_cmd(cmd, {"v": "h264"}) == (cmd, [])
+
+    new_cmd, _ = optimize_cmd(
+        "ffmpeg -i in.mp4 -ss 10 -bitexact -vframes 1 out.jpg",
+        rules=["seek_before_input"],
+    )
+    assert new_cmd == "ffmpeg -ss 10 -i in.mp4 -bitexact -vframes 1 out.jpg"
+
+
+def test_get_input_codecs():
+    probe = {
+        "streams": [
+            {"codec_type": "video", "codec_name": "h264"},
+            {"codec_type": "audio", "codec_name": "aac"},
+            {"codec_type": "audio", "codec_name": "ac3"},
+            {"codec_type": "subtitle", "codec_name": "mov_text"},
+        ]
+    }
+    assert get_input_codecs(probe) == {"v": "h264", "a": "aac"}
+
+    cover_art = {"codec_type": "video", "codec_name": "mjpeg"}
+    probe = {
+        "streams": [
+            {"codec_type": "audio", "codec_name": "mp3"},
+            {**cover_art, "disposition": {"attached_pic": 1}},
+        ]
+    }
+    assert get_input_codecs(probe) == {"a": "mp3", "attached_pic": "mjpeg"}
+    assert get_input_codecs({}) == {}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_history.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for job resource accounting and history
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import shlex
+import sys
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.history import JobHistory, get_command_template, get_preset
+from app.models import ResourceUsage
+from app.utils.execution import ExecutionResult, run_command
+from unittest.mock import patch
+
+
+client = TestClient(app)
+
+HOUR = 3600
+
+
+def test_get_command_template():
+    cmd = "ffmpeg -i '/uploads/a b/in.mp4' -i /uploads/c/in.wav -crf 23 '/outputs/d/out.mp4'"
+    assert (
+        get_command_template(cmd)
+        == "ffmpeg -i '<input0>' -i '<input1>' -crf 23 '<output>.mp4'"
+    )
+
+
+def test_get_preset():
+    assert get_preset("ffmpeg -i in.mp4 -preset veryfast out.mp4") == "veryfast"
+    assert get_preset("ffmpeg -i in.mp4 -preset:v slow out.mp4") == "slow"
+    assert get_preset("ffmpeg -i in.mp4 out.mp4") == "none"
+
+
+def test_run_command_reports_resource_usage():
+    script = "sum(range(3_000_000)); b = bytearray(64 * 1024 * 1024)"
+    result = run_command(
+        f"{shlex.quote(sys.executable)} -c {shlex.quote(script)}", timeout=10
+    )
+
+    assert result.returncode == 0
+    assert result.usage.user_cpu_seconds + result.usage.system_cpu_seconds > 0
+    assert result.usage.max_rss_bytes >= 64 * 1024 * 1024
+    assert result.usage.wall_seconds > 0
+
+
+@patch("app.history.get_ffmpeg_version")
+def test_history_aggregate(mock_ffmpeg_version, tmp_path):
+    history = JobHistory(str(tmp_path / "history.db"))
+    fast = "ffmpeg -i /in/a.mp4 -preset fast /out/a.mp4"
+    slow = "ffmpeg -i /in/b.mp4 -preset slow /out/b.mp4"
+
+    mock_ffmpeg_version.return_value = "6.1"
+    history.record(fast, 0, ResourceUsage(user_cpu_seconds=2.0), finished_at=10)
+    history.record(fast, 1, ResourceUsage(user_cpu_seconds=4.0), finished_at=20)
+    history.record(slow, 0, ResourceUsage(user_cpu_seconds=9.0), finished_at=30)
+    mock_ffmpeg_version.return_value = "7.0"
+    history.record(fast, 0, ResourceUsage(user_cpu_seconds=5.0), finished_at=HOUR + 10)
+
+    by_preset = history.aggregate(["preset"], HOUR, 0, 2 * HOUR)
+    assert [(a.window_start, a.group["preset"], a.jobs) for a in by_preset] == [
+        (0, "fast", 2),
+        (0, "slow", 1),
+        (HOUR, "fast", 1),
+    ]
+    assert by_preset[0].failed == 1
+    assert by_preset[0].user_cpu_seconds == 6.0
+    assert by_preset[0].avg_cpu_seconds == 3.0
+
+    # a regression after an upgrade shows up per version
+    by_version = history.aggregate(
+        ["template", "ffmpeg_version"], 2 * HOUR, 0, 2 * HOUR
+    )
+    fast_template = get_command_template(fast)
+    assert {
+        (a.group["ffmpeg_version"], a.avg_cpu_seconds)
+        for a in by_version
+        if a.group["template"] == fast_template
+    } == {("6.1", 3.0), ("7.0", 5.0)}
+
+    assert history.prune(older_than=HOUR) == 3
+    assert len(history.aggregate([], HOUR, 0, 2 * HOUR)) == 1
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+def test_run_endpoint_records_usage(
+    mock_run_command, mock_probe_input, mock_subprocess_run, tmp_path
+):
+    mock_run_command.return_value = ExecutionResult(
+        stdout="",
+        stderr="",
+        returncode=0,
+        usage=ResourceUsage(user_cpu_seconds=1.5, max_rss_bytes=1024),
+    )
+    history = JobHistory(str(tmp_path / "history.db"))
+
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with patch("app.main.get_history", return_value=history):
+        response = client.post(
+            "/run",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+            files=files,
+        )
+        assert response.status_code == 200
+        usage = response.json()["usage"]
+        assert usage["user_cpu_seconds"] == 1.5
+        assert usage["input_bytes"] == 1024
+        assert usage["queue_wait_seconds"] >= 0
+
+        response = client.get("/history/usage", params={"group_by": "template"})
+
+    assert response.status_code == 200
+    [aggregate] = response.json()
+    assert aggregate["jobs"] == 1
+    assert aggregate["user_cpu_seconds"] == 1.5
+    assert aggregate["group"] == {
+        "template": "ffmpeg -i '<input0>' -c:v libx264 '<output>.mp4'"
+    }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_live.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for live HLS/DASH packaging
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import os
+import shlex
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.exceptions import InvalidFFmpegCommandException
+from app.live import build_live_cmd, count_segments, is_manifest_final
+from app.utils.execution import ExecutionResult
+from unittest.mock import patch
+
+
+DASH_MANIFEST = """<MPD type="dynamic">
+  <AdaptationSet contentType="video"><SegmentTemplate><SegmentTimeline>
+    <S t="0" d="4000" r="2" />
+    <S d="2000" />
+  </SegmentTimeline></SegmentTemplate></AdaptationSet>
+  <AdaptationSet contentType="audio"><SegmentTemplate><SegmentTimeline>
+    <S t="0" d="4000" r="1" />
+  </SegmentTimeline></SegmentTemplate></AdaptationSet>
+</MPD>"""
+
+
+def test_build_live_cmd_hls():
+    cmd = build_live_cmd("ffmpeg -i /in.mp4 -c:v libx264 '/out/job/stream.m3u8'")
+    tokens = shlex.split(cmd)
+    assert tokens[-1] == "/out/job/stream.m3u8"
+    assert tokens[tokens.index("-f") + 1] == "hls"
+    assert tokens[tokens.index("-hls_playlist_type") + 1] == "event"
+    assert "temp_file" in tokens[tokens.index("-hls_flags") + 1]
+    assert tokens[tokens.index("-hls_segment_filename") + 1].startswith("/out/job/")
+
+
+def test_build_live_cmd_keeps_user_options():
+    cmd = build_live_cmd("ffmpeg -i /in.mp4 -seg_duration 2 /out/job/stream.mpd")
+    tokens = shlex.split(cmd)
+    assert tokens.count("-seg_duration") == 1
+    assert tokens[tokens.index("-seg_duration") + 1] == "2"
+    assert tokens[tokens.index("-f") + 1] == "dash"
+
+
+def test_build_live_cmd_requires_manifest_output():
+    with pytest.raises(InvalidFFmpegCommandException):
+        build_live_cmd("ffmpeg -i /in.mp4 /out/job/output.mp4")
+
+
+def test_count_segments():
+    playlist = (
+        "#EXTM3U\n#EXTINF:4.0,\nsegment_00000.ts\n#EXTINF:4.0,\nsegment_00001.ts\n"
+    )
+    assert count_segments(playlist, "hls") == 2
+    assert not is_manifest_final(playlist, "hls")
+    assert is_manifest_final(playlist + "#EXT-X-ENDLIST\n", "hls")
+
+    # only the segments every representation has are playable
+    assert count_segments(DASH_MANIFEST, "dash") == 2
+    assert not is_manifest_final(DASH_MANIFEST, "dash")
+
+
+@patch("app.utils.validation.check_if_ffmpeg_installed", return_value=True)
+@patch("app.main.probe_input", return_value={})
+def test_live_endpoint(mock_probe_input, mock_ffmpeg_installed, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "output_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "live_poll_interval_seconds", 0.01)
+    next_segment = threading.Event()
+
+    def fake_run_command(cmd, timeout, log_path=None):
+        """Write two segments, the second only once the test asks for it."""
+        playlist_path = shlex.split(cmd)[-1]
+        workspace = os.path.dirname(playlist_path)
+        playlist = "#EXTM3U\n#EXT-X-PLAYLIST-TYPE:EVENT\n"
+        for index in range(2):
+            with open(os.path.join(workspace, f"segment_{index:05d}.ts"), "wb") as f:
+                f.write(b"segment")
+            playlist += f"#EXTINF:4.0,\nsegment_{index:05d}.ts\n"
+            with open(playlist_path, "w") as f:
+                f.write(playlist)
+            next_segment.wait(timeout=5)
+        with open(playlist_path, "w") as f:
+            f.write(playlist + "#EXT-X-ENDLIST\n")
+        return ExecutionResult(stdout="", stderr="", returncode=0)
+
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with (
+        TestClient(app) as client,
+        patch("app.live.run_command", side_effect=fake_run_command),
+    ):
+        response = client.post(
+            "/live",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 stream.m3u8"},
+            files=files,
+        )
+        assert response.status_code == 202
+        manifest_url = response.json()["manifest_url"]
+        job_id = response.json()["job_id"]
+
+        response = client.get(manifest_url, params={"min_segments": 1})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.headers["content-type"] == "application/vnd.apple.mpegurl"
+        assert "segment_00000.ts" in response.text
+
+        segment = client.get(f"/live/{job_id}/segment_00000.ts")
+        assert segment.content == b"segment"
+        assert "immutable" in segment.headers["cache-control"]
+        assert client.get(f"/live/{job_id}/stream.m3u8.tmp").status_code == 404
+
+        # the long-poll returns once the next segment is listed
+        next_segment.set()
+        response = client.get(manifest_url, params={"min_segments": 3})
+        assert "#EXT-X-ENDLIST" in response.text
+        assert response.headers["cache-control"] == "public, max-age=60"
+
+        for _ in range(100):
+            status = client.get(f"/live/{job_id}").json()
+            if status["status"] != "running":
+                break
+            time.sleep(0.01)
+        assert status["status"] == "succeeded"
+        assert status["segments"] == 2
+
+
+def test_live_file_not_found():
+    client = TestClient(app)
+    assert client.get("/live/not-a-uuid/stream.m3u8").status_code == 404
+    job_id = "00000000-0000-0000-0000-000000000000"
+    assert client.get(f"/live/{job_id}/stream.m3u8").status_code == 404
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_pipeline.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Ffmpeg API /pipeline endpoint tests.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+import json
+import shlex
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.exceptions import InvalidFFmpegCommandException
+from app.pipeline import parse_pipeline_steps, prepare_step_commands, run_pipeline
+from app.scheduler import scheduler
+from app.utils.execution import ExecutionResult
+from unittest.mock import patch
+
+
+client = TestClient(app)
+
+STEPS = [
+    {"id": "thumb", "cmd": "ffmpeg -i <step:video> -vframes 1 thumb.jpg"},
+    {"id": "audio", "cmd": "ffmpeg -i <input> -af volume=2 audio.wav"},
+    {"id": "video", "cmd": "ffmpeg -i <step:audio> -c:v libx264 video.mp4"},
+]
+
+
+def fake_run_command(cmd, timeout, log_path=None):
+    """Pretend to run ffmpeg by creating the output file."""
+    with open(shlex.split(cmd)[-1], "wb") as f:
+        f.write(b"output")
+    return ExecutionResult(stdout="", stderr="", returncode=0)
+
+
+def test_parse_pipeline_steps_orders_by_dependency():
+    steps = parse_pipeline_steps(json.dumps(STEPS))
+    assert [step.id for step in steps] == ["audio", "video", "thumb"]
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        [],
+        [{"id": "a", "cmd": "ffmpeg -i <input> a.mp4"}] * 2,
+        [{"id": "a", "cmd": "ffmpeg -i <step:b> a.mp4"}],
+        [
+            {"id": "a", "cmd": "ffmpeg -i <step:b> a.mp4"},
+            {"id": "b", "cmd": "ffmpeg -i <step:a> b.mp4"},
+        ],
+        [{"id": "a", "cmd": "ffmpeg -c:v libx264 a.mp4"}],
+        [
+            {"id": "a", "cmd": "ffmpeg -i <input> out.mp4"},
+            {"id": "b", "cmd": "ffmpeg -i <step:a> out.mp4"},
+        ],
+    ],
+)
+def test_parse_pipeline_steps_invalid(steps):
+    with pytest.raises(InvalidFFmpegCommandException):
+        parse_pipeline_steps(json.dumps(steps))
+
+
+def test_prepare_step_commands():
+    steps = parse_pipeline_steps(json.dumps(STEPS))
+    commands = prepare_step_commands(steps, ["/in/my video.mp4"], "/work")
+    assert commands == {
+        "audio": "ffmpeg -i '/in/my video.mp4' -af volume=2 '/work/audio.wav'",
+        "video": "ffmpeg -i '/work/audio.wav' -c:v libx264 '/work/video.mp4'",
+        "thumb": "ffmpeg -i '/work/video.mp4' -vframes 1 '/work/thumb.jpg'",
+    }
+
+
+def test_run_pipeline_runs_independent_branches_concurrently(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "max_concurrent_jobs", 2)
+    steps = parse_pipeline_steps(
+        json.dumps(
+            [
+                {"id": "a", "cmd": "ffmpeg -i <input> a.wav"},
+                {"id": "b", "cmd": "ffmpeg -i <input> b.wav"},
+            ]
+        )
+    )
+    commands = prepare_step_commands(steps, ["/in.mp4"], str(tmp_path))
+    barrier = threading.Barrier(2, timeout=5)
+
+    def run_both_at_once(cmd, timeout, log_path=None):
+        barrier.wait()  # only passes if both steps run at the same time
+        return fake_run_command(cmd, timeout)
+
+    with patch("app.pipeline.run_command", side_effect=run_both_at_once):
+        results = asyncio.run(run_pipeline(steps, commands, "client", {}))
+
+    assert [result.status for result in results] == ["succeeded", "succeeded"]
+
+
+def test_run_pipeline_skips_dependents_of_failed_steps(tmp_path):
+    steps = parse_pipeline_steps(json.dumps(STEPS))
+    commands = prepare_step_commands(steps, ["/in.mp4"], str(tmp_path))
+
+    def fail_audio(cmd, timeout, log_path=None):
+        time.sleep(0.01)
+        return ExecutionResult(stdout="", stderr="error", returncode=1)
+
+    with patch("app.pipeline.run_command", side_effect=fail_audio):
+        results = asyncio.run(run_pipeline(steps, commands, "client", {}))
+
+    assert [(r.id, r.status) for r in results] == [
+        ("audio", "failed"),
+        ("video", "skipped"),
+        ("thumb", "skipped"),
+    ]
+
+
+def test_run_pipeline_records_step_errors(tmp_path, caplog):
+    steps = parse_pipeline_steps(
+        json.dumps(
+            [
+                {"id": "a", "cmd": "ffmpeg -i <input> a.wav"},
+                {"id": "b", "cmd": "ffmpeg -i <input> b.wav"},
+            ]
+        )
+    )
+    commands = prepare_step_commands(steps, ["/in.mp4"], str(tmp_path))
+
+    def fail_a(cmd, timeout, log_path=None):
+        if cmd.endswith("a.wav'"):
+            raise OSError("Too many open files")
+        return fake_run_command(cmd, timeout)
+
+    with patch("app.pipeline.run_command", side_effect=fail_a):
+        results = asyncio.run(run_pipeline(steps, commands, "client", {}))
+
+    assert [(r.id, r.status, r.stderr) for r in results] == [
+        ("a", "failed", "Too many open files"),
+        ("b", "succeeded", ""),
+    ]
+    assert scheduler.stats().running == 0
+    assert "Pipeline step a failed" in caplog.text
+
+
+@patch("app.main.check_if_ffmpeg_installed", return_value=True)
+@patch("app.main.probe_input", return_value={})
+@patch("app.pipeline.run_command", side_effect=fake_run_command)
+def test_pipeline_endpoint(
+    mock_run_command, mock_probe_input, mock_ffmpeg_installed, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(settings, "output_dir", str(tmp_path))
+
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    response = client.post("/pipeline", data={"steps": json.dumps(STEPS)}, files=files)
+
+    assert response.status_code == 200
+    assert [step["status"] for step in response.json()["steps"]] == ["succeeded"] * 3
+    # only the final artifact is returned, intermediates are removed
+    assert list(response.json()["outputs"]) == ["thumb"]
+    assert response.json()["outputs"]["thumb"].endswith("/thumb.jpg")
+    workspace = next(tmp_path.iterdir())
+    assert [path.name for path in workspace.iterdir()] == ["thumb.jpg"]
+
+
+@patch("app.main.check_if_ffmpeg_installed", return_value=True)
+def test_pipeline_endpoint_too_many_inputs(mock_ffmpeg_installed):
+    files = [
+        ("input_file", (f"video{index}.mp4", b"a", "video/mp4"))
+        for index in range(settings.max_input_files + 1)
+    ]
+    response = client.post("/pipeline", data={"steps": json.dumps(STEPS)}, files=files)
+
+    assert response.status_code == 400
+    assert f"At most {settings.max_input_files} inputs" in response.json()["detail"]
@@ -13,7 +13,8 @@ __version__ = "0.1.0"
 
 from fastapi.testclient import TestClient
 from app.main import app
-from unittest.mock import patch, MagicMock
+from app.utils.execution import ExecutionResult
+from unittest.mock import patch
 
 
 client = TestClient(app)
@@ -94,9 +95,13 @@ def test_run_endpoint_missing_input_tag(mock_subprocess_run):
 
 
 @patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
 @patch("app.utils.file_operations.save_uploaded_file")
-def test_run_endpoint_success(mock_save_uploaded_file, mock_subprocess_run):
-    mock_subprocess_run.return_value = MagicMock(
+def test_run_endpoint_success(
+    mock_save_uploaded_file, mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(
         stdout="Success", stderr="", returncode=0
     )
 
@@ -112,6 +117,8 @@ def test_run_endpoint_success(mock_save_uploaded_file, mock_subprocess_run):
     assert response.json()["stdout"] == "Success"
     assert response.json()["stderr"] == ""
     assert response.json()["returncode"] == 0
+    assert response.json()["summary"]["errors"] == []
+    assert response.json()["log_url"] is None
 
 
 @patch("subprocess.run")
@@ -121,18 +128,55 @@ def test_run_endpoint_multiple_input_tags(mock_save_uploaded_file, mock_subproce
     files = {"input_file": ("small_video.mp4", small_file_content, "video/mp4")}
     response = client.post(
         "/run",
-        data={"cmd": "ffmpeg -i <input> -i <input> -c:v libx264 output.mp4"},
+        data={"cmd": "ffmpeg -i <input0> -i <input1> -c:v libx264 output.mp4"},
         files=files,
     )
     assert response.status_code == 400
     assert response.json() == {
-        "detail": "Command must contain exactly one input tag '-i'."
+        "detail": "Command references '<input1>' but only 1 input(s) were provided."
     }
 
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -i other.mp4 -c:v libx264 output.mp4"},
+        files=files,
+    )
+    assert response.status_code == 400
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+def test_run_endpoint_multiple_inputs(
+    mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
+
+    files = [
+        ("input_file", ("video.mp4", b"v" * 1024, "video/mp4")),
+        ("input_file", ("logo.png", b"p" * 1024, "image/png")),
+    ]
+    response = client.post(
+        "/run",
+        data={
+            "cmd": "ffmpeg -i <input0> -i <input1> -filter_complex overlay=10:10 output.mp4"
+        },
+        files=files,
+    )
+    assert response.status_code == 200
+    run_cmd = response.json()["cmd"]
+    assert run_cmd.index("/video.mp4'") < run_cmd.index("/logo.png'")
+    assert "<input" not in run_cmd
+
 
 @patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
 @patch("app.utils.file_operations.save_uploaded_file")
-def test_run_endpoint_return_file(mock_save_uploaded_file, mock_subprocess_run):
+def test_run_endpoint_return_file(
+    mock_save_uploaded_file, mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
     small_file_content = b"a" * (1 * 1024 * 1024)  # 1MB
     files = {"input_file": ("small_video.mp4", small_file_content, "video/mp4")}
     response = client.post(
@@ -147,3 +191,49 @@ def test_run_endpoint_return_file(mock_save_uploaded_file, mock_subprocess_run):
     assert response.status_code == 302
     assert "location" in response.headers
     assert "static" in response.headers["location"]
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+@patch("app.utils.file_operations.save_uploaded_file")
+def test_run_endpoint_save_log(
+    mock_save_uploaded_file, mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
+
+    small_file_content = b"a" * (1 * 1024 * 1024)  # 1MB
+    files = {"input_file": ("small_video.mp4", small_file_content, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4", "save_log": "true"},
+        files=files,
+    )
+    assert response.status_code == 200
+    assert response.json()["log_url"].endswith("/ffmpeg.log")
+    assert mock_run_command.call_args.kwargs["log_path"].endswith("/ffmpeg.log")
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+@patch("app.utils.file_operations.save_uploaded_file")
+def test_run_endpoint_optimize(
+    mock_save_uploaded_file, mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
+
+    small_file_content = b"a" * (1 * 1024 * 1024)  # 1MB
+    files = {"input_file": ("small_video.mp4", small_file_content, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={
+            "cmd": "ffmpeg -i <input> -ss 00:10:00 -vframes 1 thumb.jpg",
+            "optimize": "true",
+        },
+        files=files,
+    )
+    assert response.status_code == 200
+    assert response.json()["cmd"].startswith("ffmpeg -ss 00:10:00 -i ")
+    assert len(response.json()["optimizations"]) == 2
+    assert response.json()["output_url"].endswith("/thumb.jpg")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_scheduler.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for weighted fair job scheduling
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import asyncio
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.scheduler import FairScheduler, estimate_job_cost, get_client_id
+
+
+client = TestClient(app)
+
+
+async def run_jobs(scheduler, jobs, started):
+    """Submit (client_id, cost) jobs while the single slot is busy and
+    record the order in which they start."""
+    blocker = await scheduler.acquire("blocker", 1.0)
+
+    async def job(client_id, cost):
+        async with scheduler.slot(client_id, cost):
+            started.append((client_id, cost))
+            await asyncio.sleep(0)
+
+    tasks = []
+    for client_id, cost in jobs:
+        tasks.append(asyncio.create_task(job(client_id, cost)))
+        await asyncio.sleep(0)
+
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+
+
+def test_shortest_job_first_within_client():
+    scheduler = FairScheduler(max_concurrent_jobs=1, max_jobs_per_client=1)
+    started = []
+    asyncio.run(run_jobs(scheduler, [("a", 10.0), ("a", 1.0), ("a", 5.0)], started))
+    assert started == [("a", 1.0), ("a", 5.0), ("a", 10.0)]
+
+
+def test_fair_share_across_clients():
+    scheduler = FairScheduler(max_concurrent_jobs=1, max_jobs_per_client=1)
+    started = []
+    batch = [("batch", 3600.0)] * 5
+    asyncio.run(run_jobs(scheduler, batch + [("thumbs", 0.2)], started))
+
+    # the small job submitted last does not wait behind the whole batch
+    assert started.index(("thumbs", 0.2)) <= 1
+
+
+def test_client_weights():
+    scheduler = FairScheduler(
+        max_concurrent_jobs=1,
+        max_jobs_per_client=1,
+        client_weights={"gold": 3.0},
+    )
+    started = []
+    jobs = [("gold", 1.0)] * 6 + [("free", 1.0)] * 6
+    asyncio.run(run_jobs(scheduler, jobs, started))
+
+    first_eight = [client_id for client_id, _ in started[:8]]
+    assert first_eight.count("gold") == 6
+
+
+def test_per_client_concurrency_cap():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent_jobs=4, max_jobs_per_client=2)
+        tickets = [await scheduler.acquire("a", 1.0) for _ in range(2)]
+        waiting = asyncio.create_task(scheduler.acquire("a", 1.0))
+        await asyncio.sleep(0)
+
+        stats = scheduler.stats()
+        assert stats.running == 2
+        assert stats.queued == 1
+        assert stats.clients[0].running == 2
+
+        # other clients still get the free slots
+        other = await scheduler.acquire("b", 1.0)
+        assert scheduler.stats().running == 3
+
+        scheduler.release(tickets[0])
+        await waiting
+        assert scheduler.stats().queued == 0
+
+        for ticket in [tickets[1], other, waiting.result()]:
+            scheduler.release(ticket)
+        assert scheduler.stats().running == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent_jobs=1, max_jobs_per_client=1)
+        ticket = await scheduler.acquire("a", 1.0)
+        waiting = asyncio.create_task(scheduler.acquire("b", 1.0))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+
+        assert scheduler.stats().queued == 0
+        scheduler.release(ticket)
+        assert scheduler.stats().running == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_clients_are_evicted():
+    async def scenario():
+        scheduler = FairScheduler(
+            max_concurrent_jobs=1, max_jobs_per_client=1, idle_timeout=0
+        )
+        for client_id in ("a", "b", "c"):
+            async with scheduler.slot(client_id, 1.0):
+                pass
+
+        assert [c.client_id for c in scheduler.stats().clients] == ["c"]
+
+    asyncio.run(scenario())
+
+
+def test_get_client_id_only_honors_configured_keys(monkeypatch):
+    def request(api_key):
+        return Request(
+            {
+                "type": "http",
+                "headers": [(b"x-api-key", api_key.encode())],
+                "client": ("10.0.0.1", 1234),
+            }
+        )
+
+    monkeypatch.setattr(settings, "client_weights", {"key:6163937e6547": 2.0})
+    assert get_client_id(request("gold-key")) == "key:6163937e6547"
+    assert get_client_id(request("made-up-key")) == "ip:10.0.0.1"
+
+
+def test_estimate_job_cost():
+    probe = {"format": {"duration": "3600.0", "size": "1000000000"}}
+    thumbnail = estimate_job_cost("ffmpeg -i in.mp4 -vframes 1 thumb.jpg", probe)
+    remux = estimate_job_cost("ffmpeg -i in.mp4 -c copy out.mkv", probe)
+    transcode = estimate_job_cost("ffmpeg -i in.mp4 -c:v libx264 out.mp4", probe)
+    assert thumbnail < remux < transcode
+
+    # falls back to the input size when the duration is unknown
+    assert estimate_job_cost("ffmpeg -i in.mp4 out.mp4", {}) > 0
+    assert estimate_job_cost(
+        "ffmpeg -i in.mp4 out.mp4", {"format": {"size": "2048000"}}
+    ) > estimate_job_cost("ffmpeg -i in.mp4 out.mp4", {"format": {"size": "1024"}})
+
+
+def test_queue_stats_endpoint():
+    response = client.get("/queue/stats")
+    assert response.status_code == 200
+    assert {"running", "queued", "clients", "max_concurrent_jobs"} <= set(
+        response.json()
+    )
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_storage.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for output storage backends
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.storage import S3Storage
+from app.utils.execution import ExecutionResult
+from unittest.mock import patch
+
+
+client = TestClient(app)
+
+
+class FakeS3Client:
+    """In-memory stand-in for an S3-compatible (e.g. MinIO) client."""
+
+    def __init__(self, fail_part=None):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.fail_part = fail_part
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body.read()
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == self.fail_part:
+            raise ConnectionError("part upload failed")
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[(Bucket, Key)] = b"".join(parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId, None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+def make_output(tmp_path, content):
+    job_dir = tmp_path / "job-id"
+    job_dir.mkdir()
+    path = job_dir / "output.mp4"
+    path.write_bytes(content)
+    return path
+
+
+def test_s3_small_file_single_put(tmp_path):
+    fake = FakeS3Client()
+    storage = S3Storage(fake, bucket="media", prefix="outputs/", part_size=1024)
+    path = make_output(tmp_path, b"small")
+
+    storage.publish(str(path), "job-id/output.mp4")
+
+    assert fake.objects[("media", "outputs/job-id/output.mp4")] == b"small"
+    # local copy and the now empty job folder are removed
+    assert not path.parent.exists()
+
+
+def test_s3_multipart_upload(tmp_path):
+    fake = FakeS3Client()
+    storage = S3Storage(fake, bucket="media", part_size=1024, max_concurrency=4)
+    content = bytes(range(256)) * 41  # 10 full parts and a short one
+    path = make_output(tmp_path, content)
+
+    storage.publish(str(path), "job-id/output.mp4")
+
+    assert fake.objects[("media", "job-id/output.mp4")] == content
+    assert fake.uploads == {}
+    assert not path.exists()
+
+
+def test_s3_multipart_upload_aborts_on_failure(tmp_path):
+    fake = FakeS3Client(fail_part=3)
+    storage = S3Storage(fake, bucket="media", part_size=1024)
+    path = make_output(tmp_path, b"a" * 5000)
+
+    with pytest.raises(ConnectionError):
+        storage.publish(str(path), "job-id/output.mp4")
+
+    assert fake.aborted == ["upload-0"]
+    assert ("media", "job-id/output.mp4") not in fake.objects
+    # the local file is kept so the upload can be retried
+    assert path.exists()
+
+
+def test_s3_presigned_url():
+    storage = S3Storage(FakeS3Client(), bucket="media", presign_expiry_seconds=60)
+    assert (
+        storage.get_url(None, "job-id/output.mp4")
+        == "https://s3.test/media/job-id/output.mp4?expires=60"
+    )
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+def test_run_endpoint_with_s3_storage(
+    mock_run_command, mock_probe_input, mock_subprocess_run
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
+    storage = S3Storage(FakeS3Client(), bucket="media")
+
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with patch("app.main.get_storage", return_value=storage):
+        response = client.post(
+            "/run",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+            files=files,
+        )
+
+    assert response.status_code == 200
+    assert response.json()["output_url"].startswith("https://s3.test/media/")
+    assert response.json()["output_url"].split("?")[0].endswith("/output.mp4")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_uploads.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Resumable upload endpoint tests.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.task import cleanup_old_folders
+from app.utils.execution import ExecutionResult
+from app.utils.uploads import merge_ranges
+from unittest.mock import patch
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_merge_ranges():
+    assert merge_ranges([], 0, 10) == [(0, 10)]
+    assert merge_ranges([(0, 10), (20, 30)], 10, 20) == [(0, 30)]
+    assert merge_ranges([(20, 30)], 0, 5) == [(0, 5), (20, 30)]
+    assert merge_ranges([(0, 10)], 2, 8) == [(0, 10)]
+
+
+def test_upload_chunks_out_of_order(upload_dir):
+    content = bytes(range(256)) * 40
+    response = client.post(
+        "/uploads", data={"filename": "video.mp4", "length": len(content)}
+    )
+    assert response.status_code == 201
+    upload_id = response.json()["upload_id"]
+
+    # send the second half first
+    response = client.patch(
+        f"/uploads/{upload_id}",
+        content=content[5000:],
+        headers={"Upload-Offset": "5000"},
+    )
+    assert response.status_code == 200
+    assert response.json()["received"] == [[5000, len(content)]]
+
+    response = client.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 409
+
+    response = client.put(
+        f"/uploads/{upload_id}",
+        content=content[:5000],
+        headers={"Upload-Offset": "0"},
+    )
+    assert response.json()["received"] == [[0, len(content)]]
+
+    response = client.get(f"/uploads/{upload_id}")
+    assert response.json()["complete"] is False
+
+    response = client.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 200
+    assert response.json()["complete"] is True
+    assert (upload_dir / upload_id / "video.mp4").read_bytes() == content
+
+
+def test_upload_chunk_out_of_range():
+    response = client.post("/uploads", data={"filename": "video.mp4", "length": 10})
+    upload_id = response.json()["upload_id"]
+
+    response = client.patch(
+        f"/uploads/{upload_id}", content=b"a" * 11, headers={"Upload-Offset": "0"}
+    )
+    assert response.status_code == 416
+
+    response = client.patch(
+        f"/uploads/{upload_id}", content=b"a", headers={"Upload-Offset": "10"}
+    )
+    assert response.status_code == 416
+
+
+def test_cleanup_keeps_pending_uploads(upload_dir):
+    def create_upload(finalize):
+        response = client.post("/uploads", data={"filename": "a.mp4", "length": 1})
+        upload_id = response.json()["upload_id"]
+        client.patch(
+            f"/uploads/{upload_id}", content=b"a", headers={"Upload-Offset": "0"}
+        )
+        if finalize:
+            client.post(f"/uploads/{upload_id}/finalize")
+        hour_ago = time.time() - 60 * 60
+        os.utime(upload_dir / upload_id, (hour_ago, hour_ago))
+        return upload_id
+
+    pending = create_upload(finalize=False)
+    finalized = create_upload(finalize=True)
+    cleanup_old_folders(str(upload_dir))
+
+    assert (upload_dir / pending).is_dir()
+    assert not (upload_dir / finalized).exists()
+
+
+def test_upload_not_found():
+    assert client.get("/uploads/not-a-uuid").status_code == 404
+    assert (
+        client.get("/uploads/8d7e2f8e-8f60-4c1b-9d59-2a4fd1f2a0b1").status_code == 404
+    )
+
+
+def test_upload_too_large():
+    response = client.post(
+        "/uploads",
+        data={"filename": "video.mp4", "length": settings.max_upload_size_mb + 1},
+    )
+    assert response.status_code == 413
+
+
+@patch("subprocess.run")
+@patch("app.main.probe_input", return_value={})
+@patch("app.main.run_command")
+def test_run_with_upload_id(
+    mock_run_command, mock_probe_input, mock_subprocess_run, upload_dir
+):
+    mock_run_command.return_value = ExecutionResult(stdout="", stderr="", returncode=0)
+
+    response = client.post("/uploads", data={"filename": "video.mp4", "length": 4})
+    upload_id = response.json()["upload_id"]
+
+    data = {"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4", "upload_id": upload_id}
+    response = client.post("/run", data=data)
+    assert response.status_code == 409
+
+    client.patch(
+        f"/uploads/{upload_id}", content=b"data", headers={"Upload-Offset": "0"}
+    )
+    client.post(f"/uploads/{upload_id}/finalize")
+
+    response = client.post("/run", data=data)
+    assert response.status_code == 200
+    assert f"{upload_dir}/{upload_id}/video.mp4" in response.json()["cmd"]
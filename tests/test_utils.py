@@ -13,6 +13,7 @@ __version__ = "0.1.0"
 
 from app.utils.command_processing import preprocess_cmd
 from fastapi import UploadFile
+import io
 from unittest.mock import MagicMock, patch
 import pytest
 
@@ -27,11 +28,11 @@ def test_preprocess_cmd(mock_create_temp_folder):
         spec=UploadFile,
         filename="all the stars.mp3",
         size=5 * 1024 * 1024,
-        file=MagicMock(read=MagicMock(return_value=b"dummy data")),
+        file=io.BytesIO(b"dummy data"),
     )
 
     cmd = "ffmpeg -i <input> -c:v libx264 output.mp4"
-    processed_cmd = preprocess_cmd(input_file=mock_file, cmd=cmd)
+    processed_cmd = preprocess_cmd(input_file=[mock_file], cmd=cmd)
     assert "/tmp/all the stars.mp3" in processed_cmd
     assert (
         "ffmpeg -i '/tmp/all the stars.mp3' -c:v libx264 '/tmp/output.mp4'"
@@ -133,3 +134,162 @@ def test_input_file_size_within_limit():
     assert not input_file_size_within_limit(
         settings.max_upload_size_mb + 1
     )  # exceed limit
+
+
+def test_ffmpeg_log_collector():
+    from app.utils.ffmpeg_log import FFmpegLogCollector
+
+    log = (
+        b"ffmpeg version 6.1 Copyright (c) 2000-2023 the FFmpeg developers\n"
+        b"Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'in.mp4':\n"
+        b"  Metadata:\n"
+        b"    title           : Error Invalid Title\n"
+        b"  Duration: 00:00:10.00, start: 0.000000, bitrate: 1000 kb/s\n"
+        b"  Stream #0:0(und): Video: h264 (High), yuv420p, 1280x720, 25 fps\n"
+        b"Stream mapping:\n"
+        b"  Stream #0:0 -> #0:0 (h264 (native) -> h264 (libx264))\n"
+        b"Output #0, mp4, to 'out.mp4':\n"
+        b"  Stream #0:0(und): Video: h264, yuv420p, 1280x720, 25 fps\n"
+        b"[mp4 @ 0x1] Warning: codec tag not standard\n"
+        b"frame=   10 fps=0.0 size=0kB time=00:00:00.40\r"
+        b"frame=  250 fps=90 size=512kB time=00:00:10.00\r"
+        b"[aac @ 0x2] Error while decoding stream\n"
+    )
+    collector = FFmpegLogCollector(tail_lines=5, max_messages=10)
+    # feed in small, arbitrary chunks to exercise partial line handling
+    for i in range(0, len(log), 7):
+        collector.feed(log[i : i + 7])
+    collector.close()
+
+    summary = collector.summary
+    assert summary.inputs == [
+        "Stream #0:0(und): Video: h264 (High), yuv420p, 1280x720, 25 fps"
+    ]
+    assert summary.outputs == [
+        "Stream #0:0(und): Video: h264, yuv420p, 1280x720, 25 fps"
+    ]
+    assert summary.errors == ["[aac @ 0x2] Error while decoding stream"]
+    assert summary.warnings == ["[mp4 @ 0x1] Warning: codec tag not standard"]
+    assert summary.stats == "frame=  250 fps=90 size=512kB time=00:00:10.00"
+
+    # tail is bounded and progress updates are collapsed into one line
+    tail = collector.tail.splitlines()
+    assert len(tail) == 5
+    assert tail[-2] == "frame=  250 fps=90 size=512kB time=00:00:10.00"
+    assert tail[-1] == "[aac @ 0x2] Error while decoding stream"
+
+
+def test_run_command_bounded_capture(tmp_path):
+    import sys
+    import shlex
+    from app.utils.execution import run_command
+    from app.config import settings
+
+    script = "import sys\nfor i in range(1000): sys.stderr.write(f'line {i}\\n')\nprint('done')"
+    log_path = tmp_path / "ffmpeg.log"
+    result = run_command(
+        f"{shlex.quote(sys.executable)} -c {shlex.quote(script)}",
+        timeout=10,
+        log_path=str(log_path),
+    )
+
+    assert result.returncode == 0
+    assert result.stdout == "done\n"
+    assert len(result.stderr.splitlines()) == settings.stderr_tail_lines
+    assert result.stderr.splitlines()[-1] == "line 999"
+    assert len(log_path.read_text().splitlines()) == 1000
+
+
+def test_run_command_timeout():
+    import sys
+    import shlex
+    import subprocess
+    from app.utils.execution import run_command
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_command(
+            f"{shlex.quote(sys.executable)} -c 'import time; time.sleep(10)'",
+            timeout=0.2,
+        )
+
+
+def test_run_command_timeout_at_exit():
+    import subprocess
+    from app.utils.execution import run_command
+
+    # the timeout fires around the time the process exits, which must give
+    # either a result or a timeout, never a reaping error
+    for _ in range(20):
+        try:
+            result = run_command("sleep 0.02", timeout=0.02)
+        except subprocess.TimeoutExpired:
+            continue
+        assert result.returncode == 0
+
+
+@patch("app.utils.command_processing.create_temp_folder")
+def test_save_inputs(mock_create_temp_folder, tmp_path):
+    from app.utils.command_processing import save_inputs
+
+    mock_create_temp_folder.side_effect = [str(tmp_path / "a"), str(tmp_path / "b")]
+    files = [
+        MagicMock(
+            spec=UploadFile,
+            filename="../video.mp4",
+            size=1024,
+            file=io.BytesIO(b"v" * 1024),
+        ),
+        MagicMock(
+            spec=UploadFile, filename="logo.png", size=3, file=io.BytesIO(b"png")
+        ),
+    ]
+
+    paths = save_inputs(files, [])
+    assert paths == [
+        str(tmp_path / "a" / "video.mp4"),
+        str(tmp_path / "b" / "logo.png"),
+    ]
+    assert (tmp_path / "a" / "video.mp4").read_bytes() == b"v" * 1024
+    assert (tmp_path / "b" / "logo.png").read_bytes() == b"png"
+
+
+def test_save_inputs_validates_all_before_writing(tmp_path):
+    from app.utils.command_processing import save_inputs
+    from app.exceptions import InvalidFFmpegCommandException
+
+    files = [
+        MagicMock(spec=UploadFile, filename="a.mp4", size=10, file=io.BytesIO(b"a")),
+        MagicMock(spec=UploadFile, filename="b.mp4", size=0, file=io.BytesIO(b"")),
+    ]
+    with patch("app.utils.command_processing.create_temp_folder") as mock_folder:
+        with pytest.raises(InvalidFFmpegCommandException):
+            save_inputs(files, [])
+        mock_folder.assert_not_called()
+
+
+def test_replace_input_tags():
+    from app.utils.command_processing import replace_input_tags
+
+    cmd = "ffmpeg -i <input0> -i <input1> -i <input> -filter_complex overlay out.mp4"
+    new_cmd = replace_input_tags(cmd, ["/tmp/a b.mp4", "/tmp/logo.png"])
+    assert (
+        new_cmd
+        == "ffmpeg -i '/tmp/a b.mp4' -i '/tmp/logo.png' -i '/tmp/a b.mp4' -filter_complex overlay out.mp4"
+    )
+
+
+def test_validate_input_tags():
+    from app.utils.command_processing import validate_input_tags
+    from app.exceptions import InvalidFFmpegCommandException
+
+    validate_input_tags("ffmpeg -i <input0> -i <input1> out.mp4", 2)
+
+    invalid = [
+        ("ffmpeg -i <input0> out.mp4", 0),
+        ("ffmpeg -i <input0> -i <input2> out.mp4", 2),
+        ("ffmpeg -i <input0> -i /etc/passwd out.mp4", 2),
+        ("ffmpeg -i <input0> out.mp4", 5),
+    ]
+    for cmd, count in invalid:
+        with pytest.raises(InvalidFFmpegCommandException):
+            validate_input_tags(cmd, count)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: test_worker.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: tests for the job broker and distributed workers
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+
+import os
+import shlex
+import subprocess
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.broker import InMemoryBroker
+from app.config import settings
+from app.history import get_history
+from app.models import JobStatus, LogSummary, WorkerJob
+from app.scheduler import scheduler
+from app.storage import LocalStorage
+from app.utils import ensure_directories_exist
+from app.utils.execution import ExecutionResult
+from app.worker import Worker
+from unittest.mock import patch
+
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_job(job_id="job-1", output_dir="/out"):
+    return WorkerJob(
+        job_id=job_id,
+        cmd=f"ffmpeg -i /in.mp4 '{output_dir}/{job_id}/output.mp4'",
+        output_key=f"{job_id}/output.mp4",
+    )
+
+
+def fake_run_command(cmd, timeout, log_path=None, on_progress=None):
+    """Report progress and create the output file. Like ffmpeg without -y
+    and a terminal, fail if the output already exists."""
+    output_path = shlex.split(cmd)[-1]
+    if os.path.exists(output_path):
+        return ExecutionResult(
+            stdout="", stderr=f"File '{output_path}' already exists.", returncode=1
+        )
+    stats = "frame=  100 fps=25 time=00:00:04.00 speed=1x"
+    if on_progress:
+        on_progress(stats)
+    with open(output_path, "wb") as f:
+        f.write(b"output")
+    return ExecutionResult(
+        stdout="", stderr="", returncode=0, summary=LogSummary(stats=stats)
+    )
+
+
+def test_broker_delivers_in_order_and_acks():
+    broker = InMemoryBroker()
+    broker.enqueue(make_job("a"))
+    broker.enqueue(make_job("b"))
+
+    assert broker.reserve(60).job_id == "a"
+    assert broker.reserve(60).job_id == "b"
+    assert broker.reserve(60) is None
+
+    broker.ack("a")
+    broker.ack("b")
+    assert broker.requeue_expired() == 0
+
+
+def test_broker_requeues_after_visibility_timeout():
+    clock = FakeClock()
+    broker = InMemoryBroker(clock=clock)
+    broker.enqueue(make_job("a"))
+    broker.enqueue(make_job("b"))
+    assert broker.reserve(60).job_id == "a"
+
+    # a heartbeat keeps the job invisible
+    clock.now = 50
+    broker.extend("a", 60)
+    clock.now = 100
+    assert broker.requeue_expired() == 0
+
+    # the worker died: the job is retried before newer jobs
+    clock.now = 111
+    assert broker.requeue_expired() == 1
+    job = broker.reserve(60)
+    assert (job.job_id, job.attempts) == ("a", 1)
+
+
+def test_broker_nack_only_requeues_reserved_jobs():
+    broker = InMemoryBroker()
+    broker.enqueue(make_job("a"))
+    broker.reserve(60)
+    broker.nack("a")
+    broker.nack("a")  # already given back
+
+    assert broker.reserve(60).attempts == 1
+    assert broker.reserve(60) is None
+
+
+def test_worker_runs_job_and_publishes_result(tmp_path):
+    broker = InMemoryBroker()
+    job = make_job(output_dir=str(tmp_path))
+    (tmp_path / job.job_id).mkdir()
+    broker.enqueue(job)
+
+    with patch("app.worker.run_command", side_effect=fake_run_command):
+        assert Worker(broker, LocalStorage(), name="w1").process_next()
+
+    status = broker.get_status(job.job_id)
+    assert status.status == "succeeded"
+    assert status.worker == "w1"
+    assert status.progress.startswith("frame=")
+    assert status.result.output_url == "job-1/output.mp4"
+    assert broker.reserve(60) is None
+
+
+def test_worker_returns_job_when_it_cannot_finish(tmp_path):
+    broker = InMemoryBroker()
+    job = make_job(output_dir=str(tmp_path))
+    (tmp_path / job.job_id).mkdir()
+    broker.enqueue(job)
+
+    storage = LocalStorage()
+    with (
+        patch("app.worker.run_command", side_effect=fake_run_command),
+        patch.object(storage, "publish", side_effect=ConnectionError),
+    ):
+        Worker(broker, storage).process_next()
+
+    assert broker.get_status(job.job_id).status == "running"
+    assert broker.reserve(60).attempts == 1
+
+
+def test_worker_retry_replaces_partial_output(tmp_path):
+    broker = InMemoryBroker()
+    job = make_job(output_dir=str(tmp_path))
+    (tmp_path / job.job_id).mkdir()
+    broker.enqueue(job)
+
+    # the first attempt writes the output but cannot publish it
+    storage = LocalStorage()
+    with (
+        patch("app.worker.run_command", side_effect=fake_run_command),
+        patch.object(storage, "publish", side_effect=[ConnectionError, None]),
+    ):
+        worker = Worker(broker, storage)
+        worker.process_next()
+        worker.process_next()
+
+    status = broker.get_status(job.job_id)
+    assert (status.status, status.attempts) == ("succeeded", 1)
+    assert status.result.returncode == 0
+
+
+def test_worker_heartbeat_survives_broker_errors(monkeypatch):
+    monkeypatch.setattr(settings, "broker_visibility_timeout_seconds", 0.03)
+    broker = InMemoryBroker()
+    calls = []
+
+    def flaky_extend(job_id, visibility_timeout):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise ConnectionError
+
+    broker.extend = flaky_extend
+    done = threading.Event()
+    status = JobStatus(job_id="job-1", status="running")
+    heartbeat = threading.Thread(
+        target=Worker(broker, LocalStorage())._heartbeat, args=(status, [], done)
+    )
+    heartbeat.start()
+    for _ in range(100):
+        if len(calls) >= 3:
+            break
+        time.sleep(0.01)
+    done.set()
+    heartbeat.join()
+
+    assert len(calls) >= 3
+
+
+def test_worker_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(settings, "broker_max_retries", 1)
+    clock = FakeClock()
+    broker = InMemoryBroker(clock=clock)
+    broker.enqueue(make_job())
+    for _ in range(2):
+        broker.reserve(60)
+        clock.now += 61
+        broker.requeue_expired()
+
+    with patch("app.worker.run_command") as mock_run_command:
+        Worker(broker, LocalStorage()).process_next()
+
+    mock_run_command.assert_not_called()
+    assert broker.get_status("job-1").status == "failed"
+    assert broker.reserve(60) is None
+
+
+@pytest.fixture
+def distributed(monkeypatch, tmp_path):
+    """Run the API in distributed mode with a worker thread."""
+    # Job ids are the output folder relative to the output directory, which
+    # must stay one level deep, so move the relative directories instead
+    monkeypatch.chdir(tmp_path)
+    ensure_directories_exist()
+    monkeypatch.setattr(settings, "execution_mode", "distributed")
+    monkeypatch.setattr(settings, "broker_poll_interval_seconds", 0.01)
+    broker = InMemoryBroker()
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=Worker(broker, LocalStorage()).run, args=(stop,), daemon=True
+    )
+    with (
+        patch("app.main.get_broker", return_value=broker),
+        patch("app.main.probe_input", return_value={}),
+        patch("app.utils.validation.check_if_ffmpeg_installed", return_value=True),
+        patch("app.worker.run_command", side_effect=fake_run_command),
+    ):
+        worker.start()
+        yield broker
+        stop.set()
+        worker.join()
+
+
+def test_run_endpoint_distributed(distributed):
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+        files=files,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["returncode"] == 0
+    assert response.json()["output_url"].startswith("http://testserver/static/")
+
+
+def test_run_endpoint_distributed_records_history_once(distributed):
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+        files=files,
+    )
+    job_id = response.json()["output_url"].split("/")[-2]
+    client.get(f"/jobs/{job_id}")
+
+    [aggregate] = get_history().aggregate([], 3600, 0, time.time() + 1)
+    assert aggregate.jobs == 1
+    assert aggregate.input_bytes == 1024
+
+
+def test_run_endpoint_distributed_bypasses_scheduler(distributed):
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with patch.object(scheduler, "acquire") as mock_acquire:
+        response = client.post(
+            "/run",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+            files=files,
+        )
+
+    assert response.status_code == 200
+    # fairness is local mode only, the broker serves jobs first come first served
+    mock_acquire.assert_not_called()
+
+
+def test_run_endpoint_distributed_without_waiting(distributed):
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4", "wait": "false"},
+        files=files,
+    )
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    for _ in range(100):
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] == "succeeded":
+            break
+        time.sleep(0.01)
+    assert status["status"] == "succeeded"
+    assert status["result"]["output_url"].endswith(f"/static/{job_id}/output.mp4")
+
+
+def test_run_endpoint_distributed_command_timeout(distributed):
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with patch(
+        "app.worker.run_command", side_effect=subprocess.TimeoutExpired("ffmpeg", 1)
+    ):
+        response = client.post(
+            "/run",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+            files=files,
+        )
+
+    assert response.status_code == 408
+    assert response.json() == {"error": "Command timed out"}
+
+
+def test_run_endpoint_distributed_job_failed(distributed, monkeypatch):
+    monkeypatch.setattr(settings, "broker_max_retries", 0)
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    with patch.object(LocalStorage, "publish", side_effect=ConnectionError):
+        response = client.post(
+            "/run",
+            data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+            files=files,
+        )
+
+    assert response.status_code == 500
+    assert response.json() == {"error": "Job failed after 1 attempts."}
+
+
+def test_run_endpoint_distributed_wait_timeout(distributed, monkeypatch):
+    monkeypatch.setattr(settings, "job_wait_timeout_seconds", 0)
+    files = {"input_file": ("small_video.mp4", b"a" * 1024, "video/mp4")}
+    response = client.post(
+        "/run",
+        data={"cmd": "ffmpeg -i <input> -c:v libx264 output.mp4"},
+        files=files,
+    )
+
+    assert response.status_code == 408
+    assert response.json()["error"].startswith("Timed out waiting for job")
+
+
+def test_job_status_not_found():
+    assert client.get("/jobs/unknown").status_code == 404
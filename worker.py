@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: worker.py
+Author: Maria Kevin
+Created: 2025-11-09
+Description: Worker EntryPoint for distributed execution of FFmpeg jobs.
+"""
+
+__author__ = "Maria Kevin"
+__version__ = "0.1.0"
+
+from app.worker import main
+
+if __name__ == "__main__":
+    main()